@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+End-to-end crawl benchmark against the local mock server
+Reports wall time, requests/sec, items/sec and memory per engine configuration
+"""
+
+import contextlib
+import io
+import json
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import crawl_books
+import crawl_music
+from mock_server import MockServer
+
+
+# ==================== Configuration ====================
+
+# (engine, mode) pairs run by default
+DEFAULT_CONFIGS = [
+    ('books', 'sequential'),
+    ('books', 'concurrent'),
+    ('music', 'sequential'),
+    ('music', 'concurrent'),
+]
+
+
+# ==================== Engine Runners ====================
+
+def run_books(emotion):
+    """Crawl one emotion with the book engine, return number of items"""
+    return len(crawl_books.crawl_emotion(emotion, crawl_books.EMOTION_KEYWORDS[emotion]))
+
+
+def run_music(emotion):
+    """Crawl one emotion with the music engine, return number of items"""
+    session = crawl_music.create_session()
+    try:
+        songs = crawl_music.crawl_emotion(session, emotion, crawl_music.EMOTION_GENRES[emotion])
+    finally:
+        session.close()
+    return len(songs)
+
+
+ENGINES = {
+    'books': run_books,
+    'music': run_music,
+}
+
+
+def configure_delays(delay):
+    """
+    Override crawler politeness delays
+
+    Args:
+        delay (float): Seconds between requests (music uses [delay, delay])
+    """
+    crawl_books.DELAY_SECONDS = delay
+    crawl_music.MIN_DELAY = delay
+    crawl_music.MAX_DELAY = delay
+
+
+def run_config(server, engine, mode, emotions, workers, trace_memory=True):
+    """
+    Run one engine configuration and collect metrics
+
+    Args:
+        server (MockServer): Running mock server
+        engine (str): 'books' or 'music'
+        mode (str): 'sequential' or 'concurrent' (one emotion per worker)
+        emotions (list): Emotions to crawl
+        workers (int): Worker threads for concurrent mode
+        trace_memory (bool): Track peak Python allocations with tracemalloc
+
+    Returns:
+        dict: Benchmark result
+    """
+    runner = ENGINES[engine]
+    server.stats.reset()
+
+    if trace_memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    # Crawlers print progress for every request; keep benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == 'sequential':
+            items = sum(runner(emotion) for emotion in emotions)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                items = sum(pool.map(runner, emotions))
+    wall = time.perf_counter() - start
+
+    peak_bytes = None
+    if trace_memory:
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    stats = server.stats.snapshot()
+    return {
+        'engine': engine,
+        'mode': mode,
+        'workers': workers if mode == 'concurrent' else 1,
+        'emotions': len(emotions),
+        'wall_seconds': round(wall, 3),
+        'requests': stats['requests'],
+        'requests_per_sec': round(stats['requests'] / wall, 2) if wall else None,
+        'items': items,
+        'items_per_sec': round(items / wall, 2) if wall else None,
+        'peak_memory_mb': round(peak_bytes / 1024 / 1024, 2) if peak_bytes is not None else None,
+        'bytes_received': stats['bytes_sent'],
+        'statuses': stats['statuses'],
+        'peak_rps': stats['peak_rps'],
+        'min_gap_seconds': round(stats['min_gap_seconds'], 4) if stats['min_gap_seconds'] is not None else None,
+    }
+
+
+def check_rate_limit(result, max_rps):
+    """
+    Mark whether observed traffic stayed under the allowed request rate
+
+    Args:
+        result (dict): Benchmark result from run_config
+        max_rps (int): Allowed requests per second (0 = not checked)
+    """
+    if max_rps:
+        result['rate_limit_ok'] = result['peak_rps'] <= max_rps
+        result['throttled'] = result['statuses'].get('429', 0)
+
+
+def print_results(results):
+    """Print a compact comparison table"""
+    print("\n" + "=" * 96)
+    print(f"{'engine':<7}{'mode':<12}{'wall(s)':>9}{'reqs':>7}{'req/s':>9}{'items':>8}"
+          f"{'items/s':>9}{'mem(MB)':>9}{'peak rps':>10}{'429':>6}{'5xx':>6}")
+    print("-" * 96)
+    for r in results:
+        errors = sum(v for k, v in r['statuses'].items() if k.startswith('5'))
+        mem = r['peak_memory_mb'] if r['peak_memory_mb'] is not None else '-'
+        print(f"{r['engine']:<7}{r['mode']:<12}{r['wall_seconds']:>9}{r['requests']:>7}"
+              f"{r['requests_per_sec']:>9}{r['items']:>8}{r['items_per_sec']:>9}{mem:>9}"
+              f"{r['peak_rps']:>10}{r['statuses'].get('429', 0):>6}{errors:>6}")
+    print("=" * 96)
+
+
+# ==================== Main Execution ====================
+
+def main():
+    """Main execution function"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Crawl engine benchmark against the local mock server')
+    parser.add_argument('--engines', nargs='+', default=['books', 'music'], choices=list(ENGINES))
+    parser.add_argument('--modes', nargs='+', default=['sequential', 'concurrent'],
+                        choices=['sequential', 'concurrent'])
+    parser.add_argument('--emotions', nargs='+', default=['joy', 'sadness', 'anger'])
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--delay', type=float, default=0.0,
+                        help='Politeness delay between requests (production: books 2s, music 2~5s)')
+    parser.add_argument('--latency', default='uniform:0.01,0.05')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--max-rps', type=int, default=0,
+                        help='Server-side rate limit; results report whether traffic stayed under it')
+    parser.add_argument('--kyobo-pages', type=int, default=crawl_books.PAGES_PER_KEYWORD)
+    parser.add_argument('--melon-songs-per-genre', type=int, default=100)
+    parser.add_argument('--fixtures', default=None,
+                        help='Directory with recorded pages (kyobo_search.html, melon_list.html, melon_detail.html)')
+    parser.add_argument('--no-tracemalloc', action='store_true', help='Skip memory tracking (lower overhead)')
+    parser.add_argument('--json', default=None, help='Also write results to this JSON file')
+    args = parser.parse_args()
+
+    configure_delays(args.delay)
+
+    server = MockServer(latency=args.latency, error_rate=args.error_rate,
+                        throttle_rate=args.throttle_rate, max_rps=args.max_rps,
+                        kyobo_pages=args.kyobo_pages,
+                        melon_songs_per_genre=args.melon_songs_per_genre,
+                        fixtures_dir=args.fixtures)
+
+    results = []
+    with server:
+        crawl_books.KYOBO_SEARCH_BASE_URL = server.url
+        crawl_music.MELON_BASE_URL = server.url
+        print(f"[INFO] Mock server: {server.url}")
+
+        for engine, mode in DEFAULT_CONFIGS:
+            if engine not in args.engines or mode not in args.modes:
+                continue
+            print(f"[RUN] {engine} / {mode} ...")
+            result = run_config(server, engine, mode, args.emotions, args.workers,
+                                trace_memory=not args.no_tracemalloc)
+            check_rate_limit(result, args.max_rps)
+            results.append(result)
+
+    print_results(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"[OK] Saved results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
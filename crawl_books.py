@@ -10,6 +10,11 @@ import os
 import requests
 from bs4 import BeautifulSoup
 
+import profiling
+from json_store import locked, write_json_atomic
+from profiling import stage
+from seen_index import SeenIndex
+
 
 # ==================== Configuration ====================
 
@@ -28,8 +33,9 @@ PAGES_PER_KEYWORD = 3
 SORT_TYPES = ['best', 'sale']  # popularity, sales
 DELAY_SECONDS = 2
 
-# URL pattern
-SEARCH_URL_TEMPLATE = "https://search.kyobobook.co.kr/search?keyword={keyword}&target=kyobo&sort={sort}&page={page}"
+# URL pattern (override KYOBO_SEARCH_BASE_URL to point at a local mock server)
+KYOBO_SEARCH_BASE_URL = os.environ.get('KYOBO_SEARCH_BASE_URL', 'https://search.kyobobook.co.kr')
+SEARCH_URL_TEMPLATE = "{base_url}/search?keyword={keyword}&target=kyobo&sort={sort}&page={page}"
 
 # Request headers
 HEADERS = {
@@ -136,7 +142,7 @@ def parse_book_item(item):
 
 # ==================== Crawling Functions ====================
 
-def crawl_keyword(keyword, sort_type='best', page=1):
+def crawl_keyword(keyword, sort_type='best', page=1, is_seen=None):
     """
     Crawl book list for specific keyword, sort type, and page
 
@@ -144,43 +150,78 @@ def crawl_keyword(keyword, sort_type='best', page=1):
         keyword (str): Search keyword
         sort_type (str): Sort type ('best' or 'sale')
         page (int): Page number
+        is_seen (callable): Returns True for ISBNs saved in a previous run (skipped before parsing)
 
     Returns:
-        list: List of book information
+        list: List of book information (empty on failure, see fetch_keyword)
+    """
+    try:
+        return fetch_keyword(keyword, sort_type, page, is_seen)
+    except Exception as e:
+        print(f"[FAIL] Crawling failed: {e}")
+        return []
+
+
+def fetch_keyword(keyword, sort_type='best', page=1, is_seen=None, session=None):
     """
-    url = SEARCH_URL_TEMPLATE.format(keyword=keyword, sort=sort_type, page=page)
+    Same as crawl_keyword but raises on failure, so an empty result page can be
+    told apart from an error (used by refresh_daemon.py)
+
+    Args:
+        keyword (str): Search keyword
+        sort_type (str): Sort type ('best' or 'sale')
+        page (int): Page number
+        is_seen (callable): See crawl_keyword
+        session (requests.Session): Optional session (default: a plain requests.get)
+
+    Returns:
+        list: List of book information (may be empty)
+
+    Raises:
+        requests.RequestException: Network error or HTTP error status
+        ValueError: Empty response body
+    """
+    url = SEARCH_URL_TEMPLATE.format(base_url=KYOBO_SEARCH_BASE_URL, keyword=keyword,
+                                     sort=sort_type, page=page)
     print(f"Crawling: {url}")
 
-    try:
-        response = requests.get(url, headers=HEADERS, timeout=10)
+    with stage('fetch'):
+        response = (session or requests).get(url, headers=HEADERS, timeout=10)
         response.raise_for_status()
+        html = response.text
 
-        # Check if we got HTML content
-        if response.text:
-            print(f"[OK] Page loaded: {len(response.text)} bytes")
+    # Check if we got HTML content
+    if not html:
+        raise ValueError("Empty response")
 
-            # Parse HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
+    print(f"[OK] Page loaded: {len(html)} bytes")
 
-            # Find all book items
-            items = soup.select('li.prod_item')
-            print(f"[OK] Found {len(items)} book items")
+    with stage('parse'):
+        # Parse HTML
+        soup = BeautifulSoup(html, 'html.parser')
 
-            books = []
-            for item in items:
-                book = parse_book_item(item)
-                if book:
-                    books.append(book)
+        # Find all book items
+        items = soup.select('li.prod_item')
+        print(f"[OK] Found {len(items)} book items")
 
-            print(f"[OK] Successfully parsed {len(books)} books")
-            return books
-        else:
-            print("[FAIL] Empty response")
-            return []
+        books = []
+        skipped = 0
+        for item in items:
+            if is_seen is not None:
+                pid_input = item.select_one('input.result_checkbox')
+                isbn = pid_input.get('data-bid', '') if pid_input else ''
+                if isbn and is_seen(isbn):
+                    skipped += 1
+                    continue
 
-    except Exception as e:
-        print(f"[FAIL] Crawling failed: {e}")
-        return []
+            book = parse_book_item(item)
+            if book:
+                books.append(book)
+
+    if skipped:
+        print(f"[INFO] Skipped {skipped} books seen in previous runs")
+    print(f"[OK] Successfully parsed {len(books)} books")
+    return books
 
 
 # ==================== Data Management ====================
@@ -219,13 +260,34 @@ def remove_duplicates(books):
     return unique_books
 
 
+def load_from_json(filename):
+    """
+    Load previously saved books for an emotion
+
+    Args:
+        filename (str): Filename under data/books (e.g., 'joy.json')
+
+    Returns:
+        list: Saved books (empty if the file does not exist)
+    """
+    filepath = os.path.join('data', 'books', filename)
+    if not os.path.exists(filepath):
+        return []
+
+    with open(filepath, encoding='utf-8') as f:
+        return json.load(f)
+
+
 def save_to_json(books, filename):
     """
-    Save book list to JSON file
+    Save book list to JSON file (atomic: a failed write keeps the previous file)
 
     Args:
         books (list): List of book dictionaries
         filename (str): Output filename (e.g., 'joy.json')
+
+    Returns:
+        bool: True if the file was written
     """
     # Create data/books directory if not exists
     os.makedirs('data/books', exist_ok=True)
@@ -233,22 +295,25 @@ def save_to_json(books, filename):
     filepath = os.path.join('data', 'books', filename)
 
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(books, f, ensure_ascii=False, indent=2)
+        with stage('save'):
+            write_json_atomic(filepath, books)
         print(f"[OK] Saved {len(books)} books to {filepath}")
+        return True
     except Exception as e:
         print(f"[FAIL] Failed to save JSON: {e}")
+        return False
 
 
 # ==================== Orchestration Functions ====================
 
-def crawl_emotion(emotion_name, keywords):
+def crawl_emotion(emotion_name, keywords, is_seen=None):
     """
     Crawl books for a specific emotion with multiple keywords
 
     Args:
         emotion_name (str): Emotion name (e.g., 'joy', 'sadness')
         keywords (list): List of search keywords
+        is_seen (callable): Optional ISBN predicate passed to crawl_keyword
 
     Returns:
         list: All books collected for this emotion (deduplicated)
@@ -269,34 +334,83 @@ def crawl_emotion(emotion_name, keywords):
 
             # Crawl multiple pages
             for page in range(1, PAGES_PER_KEYWORD + 1):
-                books = crawl_keyword(keyword, sort_type, page)
+                books = crawl_keyword(keyword, sort_type, page, is_seen)
                 all_books.extend(books)
 
                 # Delay between requests (be polite!)
-                time.sleep(DELAY_SECONDS)
+                with stage('sleep'):
+                    time.sleep(DELAY_SECONDS)
 
     # Remove duplicates
     print(f"\n[Summary] Total books before deduplication: {len(all_books)}")
-    unique_books = remove_duplicates(all_books)
+    with stage('dedup'):
+        unique_books = remove_duplicates(all_books)
     print(f"[Summary] Unique books after deduplication: {len(unique_books)}")
 
     return unique_books
 
 
-def crawl_all_emotions():
+def crawl_emotion_incremental(emotion_name, keywords, seen_index):
+    """
+    Crawl only books not seen in previous runs and merge them into the saved file
+
+    Args:
+        emotion_name (str): Emotion name (e.g., 'joy', 'sadness')
+        keywords (list): List of search keywords
+        seen_index (SeenIndex): Persistent seen-ID index (namespace 'isbn/<emotion>')
+
+    Returns:
+        list: Saved books (previous + new)
+    """
+    namespace = f"isbn/{emotion_name}"
+    filename = f"{emotion_name}.json"
+    filepath = os.path.join('data', 'books', filename)
+
+    # Only skip books that are really in the file (it may have been overwritten or restored)
+    with locked(filepath):
+        added, removed = seen_index.sync(namespace, [book.get('isbn') for book in load_from_json(filename)])
+    if added or removed:
+        print(f"[INFO] Seen index synced with {filepath}: +{added} / -{removed} ISBNs")
+
+    new_books = crawl_emotion(emotion_name, keywords,
+                              is_seen=lambda isbn: seen_index.contains(namespace, isbn))
+
+    # Lock the merge so concurrent workers on the same emotion keep each other's books
+    with locked(filepath):
+        books = remove_duplicates(load_from_json(filename) + new_books)
+        saved = save_to_json(books, filename)
+
+    if not saved:
+        print(f"[WARN] Not recording {len(new_books)} new ISBNs; they will be crawled again next run")
+        return books
+
+    # Record after saving so an interrupted run never hides unsaved books
+    seen_index.add_many(namespace, [book['isbn'] for book in books])
+    seen_index.print_stats()
+
+    return books
+
+
+def crawl_all_emotions(seen_index=None):
     """
     Crawl books for all emotions and save to separate JSON files
+
+    Args:
+        seen_index (SeenIndex): Skip books saved in previous runs and merge new ones
     """
     print("=" * 60)
     print("FULL CRAWLING - ALL EMOTIONS")
     print("=" * 60)
 
     for emotion_key, keywords in EMOTION_KEYWORDS.items():
-        books = crawl_emotion(emotion_key, keywords)
+        if seen_index is not None:
+            books = crawl_emotion_incremental(emotion_key, keywords, seen_index)
+        else:
+            books = crawl_emotion(emotion_key, keywords)
 
-        # Save to JSON file
-        filename = f"{emotion_key}.json"
-        save_to_json(books, filename)
+            # Save to JSON file
+            filename = f"{emotion_key}.json"
+            save_to_json(books, filename)
 
         print(f"\n[DONE] {emotion_key}: {len(books)} books saved\n")
 
@@ -314,13 +428,34 @@ def main():
     # Available emotions
     available_emotions = list(EMOTION_KEYWORDS.keys())
 
-    if len(sys.argv) > 1:
-        if sys.argv[1] == '--full':
+    # Profiling mode: per-stage reports under profile/
+    if '--profile' in sys.argv:
+        sys.argv.remove('--profile')
+        profiling.enable('books')
+
+    # Incremental mode: persistent seen-ID index under data/seen
+    seen_index = None
+    if '--seen-index' in sys.argv:
+        sys.argv.remove('--seen-index')
+        seen_index = SeenIndex()
+
+    try:
+        run(sys.argv[1:], available_emotions, seen_index)
+    finally:
+        profiling.finish()
+        if seen_index is not None:
+            seen_index.close()
+
+
+def run(args, available_emotions, seen_index=None):
+    """Dispatch CLI arguments (without --profile / --seen-index)"""
+    if args:
+        if args[0] == '--full':
             # Full crawling mode: all emotions
-            crawl_all_emotions()
+            crawl_all_emotions(seen_index)
         else:
             # Specific emotions mode
-            emotions_to_crawl = sys.argv[1:]
+            emotions_to_crawl = args
 
             # Validate emotions
             invalid = [e for e in emotions_to_crawl if e not in available_emotions]
@@ -338,8 +473,11 @@ def main():
 
             for emotion in emotions_to_crawl:
                 keywords = EMOTION_KEYWORDS[emotion]
-                books = crawl_emotion(emotion, keywords)
-                save_to_json(books, f'{emotion}.json')
+                if seen_index is not None:
+                    books = crawl_emotion_incremental(emotion, keywords, seen_index)
+                else:
+                    books = crawl_emotion(emotion, keywords)
+                    save_to_json(books, f'{emotion}.json')
                 print(f"\n[DONE] {emotion}: {len(books)} books saved\n")
 
             print("=" * 60)
@@ -353,12 +491,16 @@ def main():
         print("\nUsage:")
         print("  python crawl_books.py [emotions...]")
         print("  python crawl_books.py --full")
+        print("  python crawl_books.py [emotions... | --full] --profile")
+        print("  python crawl_books.py [emotions... | --full] --seen-index")
         print(f"\nAvailable emotions:")
         print(f"  {', '.join(available_emotions)}")
         print(f"\nExamples:")
         print(f"  python crawl_books.py joy")
         print(f"  python crawl_books.py sadness anxiety")
         print(f"  python crawl_books.py --full")
+        print(f"  python crawl_books.py joy --profile")
+        print(f"  python crawl_books.py --full --seen-index")
         print("=" * 60)
 
 
@@ -10,9 +10,17 @@ import time
 import random
 import re
 import os
+import codecs
+import threading
+from html.parser import HTMLParser
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+import profiling
+from json_store import locked, write_json_atomic
+from profiling import stage
+from seen_index import SeenIndex
+
 # ============================================================================
 # 설정 및 상수
 # ============================================================================
@@ -45,6 +53,13 @@ MAX_DELAY = 5  # 최대 딜레이 (초)
 TIMEOUT = 10    # 타임아웃 (초)
 MAX_PAGES = 10  # 최대 페이지 수
 
+# 상세 페이지 스트리밍 (장르/DJ 태그를 찾으면 나머지 본문은 받지 않음)
+STREAM_DETAIL_PAGES = True
+STREAM_CHUNK_SIZE = 4096     # 스트리밍 청크 크기 (bytes)
+STREAM_DRAIN_LIMIT = 16384   # 남은 본문이 이보다 작으면 끝까지 읽어 keep-alive 연결 유지
+# 장르/태그 영역 이후에 나오는 마커 (id 또는 class) - 지나치면 더 읽지 않음
+DETAIL_END_MARKERS = ('footer', 'd_cmtpgn_cmt_wrapper', 'section_cmt')
+
 # Headers (브라우저 위장)
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36',
@@ -59,30 +74,46 @@ HEADERS = {
     'Sec-Fetch-Site': 'same-origin'
 }
 
+# 멜론 기본 URL (MELON_BASE_URL 환경변수로 로컬 목 서버 지정 가능)
+MELON_BASE_URL = os.environ.get('MELON_BASE_URL', 'https://www.melon.com')
+
 # 데이터 저장 경로
 DATA_DIR = "data/musics"
 
+# 상세 정보 보강 상태 (list-only 모드 레코드의 detail_status)
+DETAIL_PENDING = "pending"
+DETAIL_DONE = "done"
+
 # ============================================================================
 # 유틸리티 함수
 # ============================================================================
 
-def create_session():
-    """재시도 전략이 적용된 세션 생성"""
+def create_session(retry=True):
+    """
+    재시도 전략이 적용된 세션 생성
+
+    Args:
+        retry: False면 재시도 없이 요청 1번에 전송 1번 (갱신 데몬이 호스트별 예산을 정확히 지키고
+               429/5xx를 직접 재스케줄하기 위해 사용)
+    """
     retry_strategy = Retry(
         total=3,
         backoff_factor=2,
         status_forcelist=[429, 500, 502, 503, 504]
-    )
+    ) if retry else Retry(0, read=False)  # requests 기본값과 동일 (재시도 없음)
 
     session = requests.Session()
-    session.mount("https://", HTTPAdapter(max_retries=retry_strategy))
+    adapter = HTTPAdapter(max_retries=retry_strategy)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
     return session
 
 
 def random_delay():
     """랜덤 딜레이 (봇 감지 회피)"""
     delay = random.uniform(MIN_DELAY, MAX_DELAY)
-    time.sleep(delay)
+    with stage('sleep'):
+        time.sleep(delay)
 
 
 def ensure_data_dir():
@@ -91,10 +122,67 @@ def ensure_data_dir():
         os.makedirs(DATA_DIR)
 
 
+def normalize_genre(song):
+    """장르 문자열 중복 제거 및 정렬 (예: '댄스, 댄스' → '댄스')"""
+    if song.get('genre'):
+        genres = [g.strip() for g in song['genre'].split(',')]
+        song['genre'] = ', '.join(sorted(set(genres)))
+
+
+def mark_detail_pending(song, genre_codes):
+    """
+    목록 정보만으로 레코드 완성 (상세 페이지는 나중에 보강)
+
+    Args:
+        song: parse_song_list 결과
+        genre_codes: 곡이 수집된 장르 코드 리스트
+    """
+    song['genre'] = ', '.join(GENRE_CODES.get(code, code) for code in genre_codes)
+    song['genre_codes'] = genre_codes
+    song['dj_tags'] = []
+    song['detail_status'] = DETAIL_PENDING
+    normalize_genre(song)
+
+
+def apply_song_detail(song, detail):
+    """
+    상세 정보를 레코드에 반영
+
+    Args:
+        song: 곡 레코드
+        detail: crawl_song_detail 결과
+
+    Returns:
+        bool: 반영 성공 여부 (장르/태그 모두 비었으면 실패로 보고 보류 상태 유지)
+    """
+    if not detail.get('genre') and not detail.get('dj_tags'):
+        return False
+
+    song['genre'] = detail.get('genre') or song.get('genre', '')
+    song['dj_tags'] = detail.get('dj_tags', [])
+    if 'detail_status' in song:
+        song['detail_status'] = DETAIL_DONE
+    normalize_genre(song)
+    return True
+
+
+def has_detail(song):
+    """상세 정보(장르/DJ 태그)가 반영된 레코드인지 (보강 완료 또는 전체 크롤링 결과)"""
+    return song.get('detail_status') != DETAIL_PENDING and bool(song.get('genre') or song.get('dj_tags'))
+
+
+def load_from_json(filepath):
+    """저장된 곡 리스트 로드 (파일 없으면 빈 리스트)"""
+    if not os.path.exists(filepath):
+        return []
+    with open(filepath, encoding='utf-8') as f:
+        return json.load(f)
+
+
 def save_to_json(filepath, data):
-    """데이터를 JSON 파일로 저장"""
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    """데이터를 JSON 파일로 저장 (임시 파일 + os.replace, 실패하면 기존 파일 유지하고 예외 발생)"""
+    with stage('save'):
+        write_json_atomic(filepath, data)
     print(f"[OK] 저장 완료: {filepath} ({len(data)}곡)")
 
 
@@ -142,7 +230,7 @@ def parse_song_list(row):
                                          '/melon/resize/180/quality/100/optimize')
 
         # Detail URL
-        detail_url = f"https://www.melon.com/song/detail.htm?songId={song_id}"
+        detail_url = f"{MELON_BASE_URL}/song/detail.htm?songId={song_id}"
 
         # 필터링: (Inst.) 또는 (MR) 제외
         if "(Inst.)" in title or "(MR)" in title:
@@ -199,101 +287,370 @@ def parse_song_detail(soup):
         return {"genre": "", "dj_tags": []}
 
 
+class SongDetailScanner(HTMLParser):
+    """
+    상세 페이지 증분 파서 (parse_song_detail의 스트리밍 버전)
+
+    feed()로 청크를 넣다가 장르 dd와 DJ 태그 영역이 모두 닫히거나
+    DETAIL_END_MARKERS를 만나면 done이 True가 됩니다.
+    """
+
+    VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                 'link', 'meta', 'param', 'source', 'track', 'wbr'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []          # 열린 태그 이름
+        self.genre = None        # None: 아직 못 찾음
+        self.dj_tags = []
+        self.tags_done = False
+        self.done = False
+
+        self._collect = {}       # 깊이 -> ('dt' | 'dd' | 'tag', 텍스트 조각 리스트)
+        self._await_genre_dd = False
+        self._tag_container_depth = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+
+        if attrs.get('id') in DETAIL_END_MARKERS or any(c in DETAIL_END_MARKERS for c in classes):
+            self.done = True
+            return
+
+        if tag in self.VOID_TAGS:
+            return
+
+        self.stack.append((tag, classes))
+        depth = len(self.stack)
+
+        if tag == 'dt' and self.genre is None:
+            self._collect[depth] = ('dt', [])
+        elif tag == 'dd' and self._await_genre_dd:
+            self._await_genre_dd = False
+            self._collect[depth] = ('dd', [])
+        elif tag == 'a' and 'tag_item' in classes and not self.tags_done:
+            if self._tag_container_depth is None:
+                # 태그 목록을 감싸는 가장 가까운 '*tag*' 클래스 요소 (없으면 부모, li면 목록)
+                parent_is_li = depth > 2 and self.stack[depth - 2][0] == 'li'
+                self._tag_container_depth = depth - 2 if parent_is_li else depth - 1
+                for d in range(depth - 1, 0, -1):
+                    if any('tag' in c for c in self.stack[d - 1][1]):
+                        self._tag_container_depth = d
+                        break
+            self._collect[depth] = ('tag', [])
+
+    def handle_startendtag(self, tag, attrs):
+        # <br/> 등 자체 종료 태그는 스택에 넣지 않음 (종료 마커 검사만)
+        self.handle_starttag(tag, attrs)
+        if tag not in self.VOID_TAGS and self.stack and self.stack[-1][0] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if not any(name == tag for name, _ in self.stack):
+            return
+
+        while self.stack:
+            depth = len(self.stack)
+            name, _ = self.stack.pop()
+            self._close(depth)
+            if name == tag:
+                break
+
+        if self.genre is not None and self.tags_done:
+            self.done = True
+
+    def handle_data(self, data):
+        text = data.strip()
+        if text:
+            for _, parts in self._collect.values():
+                parts.append(text)
+
+    def _close(self, depth):
+        if depth in self._collect:
+            kind, parts = self._collect.pop(depth)
+            text = ''.join(parts)
+            if kind == 'dt' and '장르' in text:
+                self._await_genre_dd = True
+            elif kind == 'dd':
+                self.genre = text
+            elif kind == 'tag' and text:
+                self.dj_tags.append(text)
+
+        if depth == self._tag_container_depth:
+            self.tags_done = True
+
+    def result(self):
+        """parse_song_detail과 같은 형태의 결과"""
+        return {
+            "genre": self.genre or "",
+            "dj_tags": self.dj_tags
+        }
+
+
 # ============================================================================
 # 크롤링 함수
 # ============================================================================
 
-def crawl_genre_list(session, genre_code):
+class DetailStats:
+    """
+    상세 페이지 스트리밍 통계 (호출 단위로 생성해 crawl_song_detail에 전달)
+
+    벤치마크 동시 실행 등 여러 스레드에서 같은 객체를 써도 되도록 잠금으로 보호합니다.
+    Content-Length 없이 (chunked/gzip) 조기 종료한 페이지는 전체 크기를 알 수 없으므로
+    절약률 계산에서 빼고 따로 셉니다.
     """
-    장르별 목록 페이지 크롤링 (페이징 지원 - 최대 10페이지)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pages = 0
+        self.bytes = 0
+        self.aborted = 0
+        self.sized_pages = 0     # 전체 크기를 아는 페이지
+        self.sized_bytes = 0     # 그 페이지들에서 실제로 받은 양
+        self.full_bytes = 0      # 그 페이지들의 전체 크기
+        self.unknown_size = 0    # 전체 크기 미상 (Content-Length 없이 조기 종료)
+
+    def record(self, downloaded, full_length, aborted):
+        """
+        상세 페이지 1개 다운로드 결과 기록
+
+        Args:
+            downloaded: 실제로 받은 바이트 (전송 기준)
+            full_length: 전체 크기 (모르면 None)
+            aborted: 조기 종료 여부
+        """
+        with self.lock:
+            self.pages += 1
+            self.bytes += downloaded
+            self.aborted += int(aborted)
+            if full_length is None:
+                self.unknown_size += 1
+            else:
+                self.sized_pages += 1
+                self.sized_bytes += downloaded
+                self.full_bytes += full_length
+
+    def snapshot(self):
+        """dict: pages, bytes, aborted, sized_pages, sized_bytes, full_bytes, unknown_size"""
+        with self.lock:
+            return {"pages": self.pages, "bytes": self.bytes, "aborted": self.aborted,
+                    "sized_pages": self.sized_pages, "sized_bytes": self.sized_bytes,
+                    "full_bytes": self.full_bytes, "unknown_size": self.unknown_size}
+
+
+def crawl_genre_page(session, genre_code, page_num, is_seen=None):
+    """
+    장르별 목록 페이지 1개 크롤링
 
     Args:
         session: requests.Session 객체
         genre_code: 장르 코드 (예: GN0100)
+        page_num: 페이지 번호 (1부터, 페이지당 50곡)
+        is_seen: 이전 실행에서 저장된 song_id면 True를 반환하는 함수 (파싱 전에 건너뜀)
 
     Returns:
-        list: 곡 정보 리스트
+        tuple: (곡 정보 리스트, 페이지의 전체 행 수) - 실패 시 None
     """
-    genre_name = GENRE_CODES.get(genre_code, genre_code)
-    print(f"  크롤링 중: {genre_name} ({genre_code})...")
-
-    all_songs = []
-
-    for page_num in range(1, MAX_PAGES + 1):
-        try:
-            # startIndex 계산 (1페이지=1, 2페이지=51, 3페이지=101, ...)
-            start_index = 1 + (page_num - 1) * 50
+    try:
+        # startIndex 계산 (1페이지=1, 2페이지=51, 3페이지=101, ...)
+        start_index = 1 + (page_num - 1) * 50
 
-            # AJAX 페이징 URL 사용 (pageSize, orderBy 파라미터 추가!)
-            url = f"https://www.melon.com/genre/song_listPaging.htm?startIndex={start_index}&pageSize=50&gnrCode={genre_code}&dtlGnrCode=&orderBy=NEW&steadyYn=Y"
+        # AJAX 페이징 URL 사용 (pageSize, orderBy 파라미터 추가!)
+        url = f"{MELON_BASE_URL}/genre/song_listPaging.htm?startIndex={start_index}&pageSize=50&gnrCode={genre_code}&dtlGnrCode=&orderBy=NEW&steadyYn=Y"
 
-            random_delay()
+        random_delay()
+        with stage('fetch'):
             response = session.get(url, headers=HEADERS, timeout=TIMEOUT)
             response.encoding = 'utf-8'
+            html = response.text
 
-            if response.status_code != 200:
-                print(f"    [ERROR] 페이지 {page_num} - HTTP {response.status_code} 에러")
-                break
+        if response.status_code != 200:
+            print(f"    [ERROR] 페이지 {page_num} - HTTP {response.status_code} 에러")
+            return None
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+        with stage('parse'):
+            soup = BeautifulSoup(html, 'html.parser')
 
             # tbody 안의 모든 tr 찾기
             tbody = soup.find('tbody')
-            if not tbody:
-                print(f"    [WARNING] 페이지 {page_num} - tbody 태그를 찾을 수 없습니다")
-                break
-
-            song_rows = tbody.find_all('tr')
-
-            # 빈 페이지면 종료
-            if len(song_rows) == 0:
-                print(f"    페이지 {page_num} - 더 이상 곡이 없습니다")
-                break
+            song_rows = tbody.find_all('tr') if tbody else []
 
             page_songs = []
+            skipped = 0
             for row in song_rows:
+                if is_seen is not None:
+                    checkbox = row.select_one('input[type="checkbox"]')
+                    song_id = checkbox.get('value', '') if checkbox else ''
+                    if song_id and is_seen(song_id):
+                        skipped += 1
+                        continue
+
                 song = parse_song_list(row)
                 if song:
                     page_songs.append(song)
 
-            all_songs.extend(page_songs)
-            print(f"    페이지 {page_num}: {len(page_songs)}곡 수집")
+        if not tbody:
+            print(f"    [WARNING] 페이지 {page_num} - tbody 태그를 찾을 수 없습니다")
+            return None
+
+        if song_rows:
+            print(f"    페이지 {page_num}: {len(page_songs)}곡 수집"
+                  + (f" (기존 {skipped}곡 건너뜀)" if skipped else ""))
+        return page_songs, len(song_rows)
+
+    except Exception as e:
+        print(f"    [ERROR] 페이지 {page_num} 크롤링 실패: {e}")
+        return None
+
+
+def crawl_genre_list(session, genre_code, is_seen=None):
+    """
+    장르별 목록 페이지 크롤링 (페이징 지원 - 최대 10페이지)
+
+    Args:
+        session: requests.Session 객체
+        genre_code: 장르 코드 (예: GN0100)
+        is_seen: crawl_genre_page 참고
+
+    Returns:
+        list: 곡 정보 리스트
+    """
+    genre_name = GENRE_CODES.get(genre_code, genre_code)
+    print(f"  크롤링 중: {genre_name} ({genre_code})...")
 
-        except Exception as e:
-            print(f"    [ERROR] 페이지 {page_num} 크롤링 실패: {e}")
+    all_songs = []
+
+    for page_num in range(1, MAX_PAGES + 1):
+        result = crawl_genre_page(session, genre_code, page_num, is_seen)
+        if result is None:
+            break
+
+        page_songs, row_count = result
+
+        # 빈 페이지면 종료
+        if row_count == 0:
+            print(f"    페이지 {page_num} - 더 이상 곡이 없습니다")
             break
 
+        all_songs.extend(page_songs)
+
     print(f"  [OK] 총 {len(all_songs)}곡 수집 완료")
     return all_songs
 
 
-def crawl_song_detail(session, detail_url):
+def crawl_song_detail(session, detail_url, stats=None):
     """
     곡 상세 페이지 크롤링
 
     Args:
         session: requests.Session 객체
         detail_url: 상세 페이지 URL
+        stats: 스트리밍 통계를 누적할 DetailStats (없으면 기록 안 함)
 
     Returns:
         dict: 추가 정보 (genre, dj_tags)
     """
     try:
         random_delay()
-        response = session.get(detail_url, headers=HEADERS, timeout=TIMEOUT)
-        response.encoding = 'utf-8'
+        if STREAM_DETAIL_PAGES:
+            return stream_song_detail(session, detail_url, stats)
+
+        with stage('fetch'):
+            response = session.get(detail_url, headers=HEADERS, timeout=TIMEOUT)
+            response.encoding = 'utf-8'
+            html = response.text
 
         if response.status_code != 200:
             return {"genre": "", "dj_tags": []}
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        return parse_song_detail(soup)
+        with stage('parse'):
+            soup = BeautifulSoup(html, 'html.parser')
+            return parse_song_detail(soup)
 
     except Exception as e:
         print(f"  [WARNING] 상세 페이지 크롤링 실패: {e}")
+        return {"genre": "", "dj_tags": []}
 
 
-def crawl_emotion(session, emotion_name, genre_codes):
+def stream_song_detail(session, detail_url, stats=None):
+    """
+    상세 페이지를 스트리밍으로 읽으며 장르/DJ 태그만 추출 (조기 종료)
+
+    Args:
+        session: requests.Session 객체
+        detail_url: 상세 페이지 URL
+        stats: DetailStats (없으면 기록 안 함)
+
+    Returns:
+        dict: 추가 정보 (genre, dj_tags)
+    """
+    scanner = SongDetailScanner()
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    # 요청부터 청크 읽기/증분 파싱/잔여분 소진까지 한 번의 fetch 단계로 기록
+    # (청크마다 단계에 들어가면 호출 수와 할당 샘플링이 페이지가 아닌 청크 단위가 됨)
+    with stage('fetch'):
+        response = session.get(detail_url, headers=HEADERS, timeout=TIMEOUT, stream=True)
+        try:
+            if response.status_code != 200:
+                return {"genre": "", "dj_tags": []}
+
+            chunks = response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+            while not scanner.done:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                scanner.feed(decoder.decode(chunk))
+
+            aborted = scanner.done
+            if not aborted:
+                scanner.feed(decoder.decode(b'', final=True))
+                scanner.close()
+
+            # Content-Length는 전송(압축) 기준, raw.tell()도 전송 바이트 기준
+            full_length = int(response.headers.get('Content-Length') or 0)
+            if aborted and full_length and full_length - response.raw.tell() <= STREAM_DRAIN_LIMIT:
+                # 남은 양이 적으면 끝까지 읽어 커넥션 재사용
+                for _ in chunks:
+                    pass
+
+            if stats is not None:
+                downloaded = response.raw.tell()
+                if full_length:
+                    stats.record(downloaded, full_length, aborted)
+                else:
+                    # 끝까지 읽었으면 받은 양이 전체 크기, 조기 종료했으면 알 수 없음
+                    stats.record(downloaded, None if aborted else downloaded, aborted)
+
+            return scanner.result()
+
+        finally:
+            response.close()
+
+
+def print_detail_stats(stats):
+    """상세 페이지 다운로드량 / 조기 종료율 출력"""
+    totals = stats.snapshot()
+    pages = totals["pages"]
+    if not pages:
+        return
+
+    avg_kb = totals["bytes"] / pages / 1024
+    abort_rate = 100 * totals["aborted"] / pages
+    line = f"[INFO] 상세 페이지 {pages}개: 평균 {avg_kb:.1f}KB 다운로드"
+
+    sized = totals["sized_pages"]
+    if sized:
+        full_kb = totals["full_bytes"] / sized / 1024
+        saved = 100 * (1 - totals["sized_bytes"] / totals["full_bytes"]) if totals["full_bytes"] else 0.0
+        line += f" (크기 확인 {sized}개 기준 전체 {full_kb:.1f}KB, {saved:.1f}% 절약)"
+    if totals["unknown_size"]:
+        line += f", 전체 크기 미상 {totals['unknown_size']}개"
+    print(f"{line}, 조기 종료율 {abort_rate:.1f}%")
+
+
+def crawl_emotion(session, emotion_name, genre_codes, list_only=False, is_seen=None):
     """
     한 감정의 모든 장르 크롤링 후 병합
 
@@ -301,6 +658,9 @@ def crawl_emotion(session, emotion_name, genre_codes):
         session: requests.Session 객체
         emotion_name: 감정 이름 (예: joy)
         genre_codes: 장르 코드 리스트
+        list_only: True면 상세 페이지를 건너뛰고 보류(pending) 상태로 반환
+                   (enrich_music.py로 나중에 보강)
+        is_seen: crawl_genre_list에 전달할 song_id 판별 함수 (기존 곡은 상세 페이지도 생략)
 
     Returns:
         list: 중복 제거된 곡 리스트
@@ -310,20 +670,32 @@ def crawl_emotion(session, emotion_name, genre_codes):
     print(f"{'='*60}")
 
     all_songs = {}  # song_id를 key로 사용 (중복 제거)
+    source_genres = {}  # song_id -> 수집된 장르 코드 리스트
 
     # 1단계: 목록 페이지 크롤링
     for genre_code in genre_codes:
-        songs = crawl_genre_list(session, genre_code)
+        songs = crawl_genre_list(session, genre_code, is_seen)
 
-        for song in songs:
-            song_id = song['song_id']
-            if song_id not in all_songs:
-                all_songs[song_id] = song
+        with stage('dedup'):
+            for song in songs:
+                song_id = song['song_id']
+                if song_id not in all_songs:
+                    all_songs[song_id] = song
+                source_genres.setdefault(song_id, [])
+                if genre_code not in source_genres[song_id]:
+                    source_genres[song_id].append(genre_code)
 
     print(f"\n1단계 완료: 총 {len(all_songs)}곡 수집 (중복 제거 완료)")
 
+    if list_only:
+        for song_id, song_data in all_songs.items():
+            mark_detail_pending(song_data, source_genres[song_id])
+        print(f"\n[INFO] list-only 모드: 상세 페이지 보강 보류 ({len(all_songs)}곡)")
+        return list(all_songs.values())
+
     # 2단계: 상세 페이지 크롤링
     print(f"\n2단계 시작: 상세 페이지 크롤링 중...")
+    detail_stats = DetailStats()
     count = 0
     total = len(all_songs)
 
@@ -334,23 +706,96 @@ def crawl_emotion(session, emotion_name, genre_codes):
         except UnicodeEncodeError:
             print(f"  [{count}/{total}] [ID:{song_id}]", end=" ")
 
-        detail = crawl_song_detail(session, song_data['detail_url'])
+        with stage('detail'):
+            detail = crawl_song_detail(session, song_data['detail_url'], detail_stats)
         song_data.update(detail)
 
         print("[OK]")
 
+    print_detail_stats(detail_stats)
+
     # 3단계: 장르 중복 제거
     for song in all_songs.values():
-        if song.get('genre'):
-            genres = [g.strip() for g in song['genre'].split(',')]
-            song['genre'] = ', '.join(sorted(set(genres)))
+        normalize_genre(song)
 
     print(f"\n3단계 완료: 데이터 병합 및 정제 완료")
 
     return list(all_songs.values())
 
 
-def crawl_all_emotions(session):
+def crawl_emotion_incremental(session, emotion_name, genre_codes, seen_index, list_only=False):
+    """
+    이전 실행에서 저장되지 않은 곡만 크롤링해 기존 JSON에 병합
+
+    Args:
+        session: requests.Session 객체
+        emotion_name: 감정 이름 (예: joy)
+        genre_codes: 장르 코드 리스트
+        seen_index: SeenIndex 객체 (네임스페이스 'song_id/<감정>')
+        list_only: crawl_emotion 참고
+
+    Returns:
+        list: 저장된 곡 리스트 (기존 + 신규)
+    """
+    namespace = f"song_id/{emotion_name}"
+    filepath = os.path.join(DATA_DIR, f"{emotion_name}.json")
+
+    # 파일에 실제로 있는 곡만 건너뛰도록 인덱스 동기화 (일반 실행/복원 등으로 파일이 바뀌었을 수 있음)
+    with locked(filepath):
+        added, removed = seen_index.sync(namespace, [song.get('song_id') for song in load_from_json(filepath)])
+    if added or removed:
+        print(f"[INFO] 인덱스 동기화 ({filepath}): +{added} / -{removed}곡")
+
+    new_songs = crawl_emotion(session, emotion_name, genre_codes, list_only,
+                              is_seen=lambda song_id: seen_index.contains(namespace, song_id))
+
+    # 같은 감정을 여러 프로세스가 크롤링해도 서로의 신규 곡을 덮어쓰지 않도록 잠금 후 병합
+    with locked(filepath):
+        songs = {song['song_id']: song for song in load_from_json(filepath)}
+        for song in new_songs:
+            songs.setdefault(song['song_id'], song)
+        songs = list(songs.values())
+        save_to_json(filepath, songs)
+
+    # 저장 후에 기록 (중단되더라도 저장 안 된 곡을 건너뛰지 않도록)
+    seen_index.add_many(namespace, [song['song_id'] for song in songs])
+    seen_index.print_stats()
+
+    return songs
+
+
+def save_list_only(filepath, songs):
+    """
+    list-only 결과 저장 - 기존 파일에서 상세 정보가 보강된 곡은 genre/dj_tags 유지
+
+    목록 정보(제목, 앨범, 커버 등)는 새 결과로 갱신하고, 보강 완료(또는 전체 크롤링)
+    레코드의 상세 필드는 그대로 옮겨 와 상세 페이지를 다시 요청하지 않도록 합니다.
+
+    Args:
+        filepath: 감정별 JSON 파일 경로
+        songs: crawl_emotion(list_only=True) 결과
+
+    Returns:
+        int: 상세 정보를 유지한 곡 수
+    """
+    kept = 0
+    with locked(filepath):
+        existing = {song['song_id']: song for song in load_from_json(filepath)}
+        for song in songs:
+            old = existing.get(song['song_id'])
+            if old and has_detail(old):
+                song['genre'] = old.get('genre', '')
+                song['dj_tags'] = old.get('dj_tags', [])
+                song['detail_status'] = DETAIL_DONE
+                kept += 1
+        save_to_json(filepath, songs)
+
+    if kept:
+        print(f"[INFO] 상세 정보 유지: {kept}곡 (보강 대기 {len(songs) - kept}곡)")
+    return kept
+
+
+def crawl_all_emotions(session, list_only=False, seen_index=None):
     """전체 6개 감정 크롤링"""
     ensure_data_dir()
 
@@ -359,11 +804,18 @@ def crawl_all_emotions(session):
     print("="*60)
 
     for emotion_name, genre_codes in EMOTION_GENRES.items():
-        songs = crawl_emotion(session, emotion_name, genre_codes)
+        if seen_index is not None:
+            crawl_emotion_incremental(session, emotion_name, genre_codes, seen_index, list_only)
+            continue
+
+        songs = crawl_emotion(session, emotion_name, genre_codes, list_only)
 
-        # JSON 파일로 저장
+        # JSON 파일로 저장 (list-only면 이미 보강된 상세 정보 유지)
         filepath = os.path.join(DATA_DIR, f"{emotion_name}.json")
-        save_to_json(filepath, songs)
+        if list_only:
+            save_list_only(filepath, songs)
+        else:
+            save_to_json(filepath, songs)
 
     print("\n" + "="*60)
     print("모든 크롤링 완료!")
@@ -382,6 +834,9 @@ def print_usage():
   python crawl_music.py joy                # joy 감정만 크롤링
   python crawl_music.py joy sadness        # joy, sadness 크롤링
   python crawl_music.py --full             # 전체 6개 감정 크롤링
+  python crawl_music.py joy --profile      # 단계별 CPU/메모리 프로파일링
+  python crawl_music.py joy --list-only    # 목록만 저장, 감정당 약 1분 (상세 정보는 enrich_music.py로 보강)
+  python crawl_music.py --full --seen-index  # 이전 실행에서 저장된 곡은 건너뛰고 새 곡만 병합
 
 감정 목록:
   joy         기쁨 (댄스, POP)
@@ -397,13 +852,32 @@ def main():
     """메인 함수"""
     import sys
 
+    # --profile 옵션: 단계별 프로파일링 (profile/ 디렉토리에 리포트 저장)
+    profile = "--profile" in sys.argv
+    if profile:
+        sys.argv.remove("--profile")
+
+    # --list-only 옵션: 상세 페이지 없이 목록 정보만 저장
+    list_only = "--list-only" in sys.argv
+    if list_only:
+        sys.argv.remove("--list-only")
+
+    # --seen-index 옵션: 실행 간 유지되는 song_id 인덱스 (data/seen)
+    use_seen_index = "--seen-index" in sys.argv
+    if use_seen_index:
+        sys.argv.remove("--seen-index")
+
     # 인자 없으면 사용법 출력
     if len(sys.argv) == 1:
         print_usage()
         return
 
+    if profile:
+        profiling.enable("music")
+
     session = create_session()
     ensure_data_dir()
+    seen_index = SeenIndex() if use_seen_index else None
 
     try:
         # --full 옵션: 전체 크롤링
@@ -411,7 +885,7 @@ def main():
             print("\n" + "="*60)
             print("전체 6개 감정 크롤링 시작")
             print("="*60)
-            crawl_all_emotions(session)
+            crawl_all_emotions(session, list_only, seen_index)
         else:
             # 특정 감정만 크롤링
             emotions_to_crawl = sys.argv[1:]
@@ -429,11 +903,18 @@ def main():
 
             for emotion_name in emotions_to_crawl:
                 genre_codes = EMOTION_GENRES[emotion_name]
-                songs = crawl_emotion(session, emotion_name, genre_codes)
+                if seen_index is not None:
+                    crawl_emotion_incremental(session, emotion_name, genre_codes, seen_index, list_only)
+                    continue
+
+                songs = crawl_emotion(session, emotion_name, genre_codes, list_only)
 
-                # JSON 파일로 저장
+                # JSON 파일로 저장 (list-only면 이미 보강된 상세 정보 유지)
                 filepath = os.path.join(DATA_DIR, f"{emotion_name}.json")
-                save_to_json(filepath, songs)
+                if list_only:
+                    save_list_only(filepath, songs)
+                else:
+                    save_to_json(filepath, songs)
 
             print("\n" + "="*60)
             print("크롤링 완료!")
@@ -445,6 +926,9 @@ def main():
         print(f"\n\n에러 발생: {e}")
     finally:
         session.close()
+        if seen_index is not None:
+            seen_index.close()
+        profiling.finish()
 
 
 if __name__ == "__main__":
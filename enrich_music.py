@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+멜론 곡 상세 정보 지연 보강 - crawl_music.py --list-only로 저장된 레코드 대상
+"""
+
+import json
+import os
+import threading
+
+from crawl_music import (
+    DATA_DIR,
+    DETAIL_PENDING,
+    EMOTION_GENRES,
+    DetailStats,
+    apply_song_detail,
+    crawl_song_detail,
+    create_session,
+    load_from_json,
+    print_detail_stats,
+    save_to_json,
+)
+from json_store import locked
+
+# ============================================================================
+# 설정 및 상수
+# ============================================================================
+
+BATCH_SIZE = 20  # 배치마다 JSON 저장 (중단되어도 진행분 유지)
+
+
+# ============================================================================
+# 데이터 로드
+# ============================================================================
+
+def emotion_path(emotion_name):
+    """감정별 JSON 파일 경로"""
+    return os.path.join(DATA_DIR, f"{emotion_name}.json")
+
+
+def load_emotion(emotion_name):
+    """감정별 곡 리스트 로드 (파일 없으면 빈 리스트)"""
+    return load_from_json(emotion_path(emotion_name))
+
+
+def is_pending(song):
+    """상세 정보 보강 대기 여부 (detail_status 없는 레코드는 전체 크롤링 결과)"""
+    return song.get('detail_status') == DETAIL_PENDING
+
+
+def load_priority(filepath):
+    """
+    우선순위 파일 로드
+
+    Args:
+        filepath: JSON 파일 - song_id 리스트(앞쪽이 우선) 또는
+                  {song_id: 점수} (예: 추천 시스템 노출 횟수, 높을수록 우선)
+
+    Returns:
+        dict: song_id -> 점수
+    """
+    with open(filepath, encoding='utf-8') as f:
+        data = json.load(f)
+
+    if isinstance(data, dict):
+        return {str(k): float(v) for k, v in data.items()}
+    return {str(song_id): float(len(data) - i) for i, song_id in enumerate(data)}
+
+
+def pending_index(emotions):
+    """
+    감정 파일들의 보류 레코드를 song_id 기준으로 묶기
+
+    같은 곡이 여러 감정 파일에 있어도 상세 페이지는 한 번만 요청합니다.
+
+    Returns:
+        tuple: (감정 -> 곡 리스트, song_id -> [(감정, 레코드), ...])
+    """
+    songs_by_emotion = {}
+    pending = {}
+
+    for emotion_name in emotions:
+        songs = load_emotion(emotion_name)
+        songs_by_emotion[emotion_name] = songs
+        for song in songs:
+            if is_pending(song):
+                pending.setdefault(song['song_id'], []).append((emotion_name, song))
+
+    return songs_by_emotion, pending
+
+
+# ============================================================================
+# 보강 함수
+# ============================================================================
+
+def enrich(session, emotions=None, song_ids=None, priority=None, limit=None,
+           batch_size=BATCH_SIZE, stop_event=None):
+    """
+    보류 레코드의 상세 정보 보강
+
+    상세 페이지 요청은 잠금 없이 하고, 배치마다 감정 파일을 잠근 뒤 다시 읽어
+    아직 보류 상태인 레코드에만 반영합니다. 백그라운드 보강과 온디맨드 보강,
+    크롤러 병합이 동시에 돌아도 서로의 결과를 덮어쓰지 않습니다.
+
+    Args:
+        session: requests.Session 객체
+        emotions: 대상 감정 리스트 (None이면 전체)
+        song_ids: 이 곡들만 보강 (온디맨드)
+        priority: song_id -> 점수 (높은 곡부터 보강)
+        limit: 최대 보강 곡 수 (예: 추천 상위 N곡)
+        batch_size: 배치 크기 (배치마다 JSON 저장)
+        stop_event: threading.Event - 설정되면 현재 배치 저장 후 중단
+
+    Returns:
+        dict: 통계 (enriched, failed, skipped, remaining)
+    """
+    emotions = emotions or list(EMOTION_GENRES.keys())
+    _, pending = pending_index(emotions)
+
+    targets = list(pending.keys())
+    if song_ids is not None:
+        wanted = {str(song_id) for song_id in song_ids}
+        targets = [song_id for song_id in targets if song_id in wanted]
+    if priority:
+        # 안정 정렬: 점수가 같으면 파일 순서 유지
+        targets.sort(key=lambda song_id: -priority.get(song_id, 0.0))
+    if limit is not None:
+        targets = targets[:limit]
+
+    print(f"\n[INFO] 보강 대상: {len(targets)}곡 (전체 보류 {len(pending)}곡)")
+
+    stats = {"enriched": 0, "failed": 0, "skipped": 0, "remaining": len(pending)}
+    detail_stats = DetailStats()
+
+    for start in range(0, len(targets), batch_size):
+        if stop_event is not None and stop_event.is_set():
+            break
+
+        # 다른 작업이 그사이 보강한 곡은 다시 요청하지 않음
+        _, pending = pending_index(emotions)
+
+        details = {}
+        touched = set()
+        for song_id in targets[start:start + batch_size]:
+            copies = pending.get(song_id)
+            if not copies:
+                stats["skipped"] += 1
+                continue
+
+            detail = crawl_song_detail(session, copies[0][1]['detail_url'], detail_stats)
+            ok = bool(detail.get('genre') or detail.get('dj_tags'))
+            if ok:
+                details[song_id] = detail
+                touched.update(emotion_name for emotion_name, _ in copies)
+
+            stats["enriched" if ok else "failed"] += 1
+            print(f"  [{'OK' if ok else 'FAIL'}] {song_id} {copies[0][1].get('title', '')}")
+
+        # 배치 단위 체크포인트
+        save_details(sorted(touched), details)
+
+    stats["remaining"] = len(pending_index(emotions)[1])
+
+    print_detail_stats(detail_stats)
+    print(f"[INFO] 보강 {stats['enriched']}곡, 실패 {stats['failed']}곡, "
+          f"건너뜀 {stats['skipped']}곡, 남은 보류 {stats['remaining']}곡")
+    return stats
+
+
+def save_details(emotions, details):
+    """
+    상세 정보를 감정 파일에 반영 (파일 잠금 후 다시 읽어 병합)
+
+    Args:
+        emotions: 반영할 감정 리스트
+        details: song_id -> crawl_song_detail 결과
+    """
+    for emotion_name in emotions:
+        path = emotion_path(emotion_name)
+        with locked(path):
+            songs = load_emotion(emotion_name)
+            changed = False
+            for song in songs:
+                detail = details.get(song.get('song_id'))
+                if detail and is_pending(song):
+                    changed = apply_song_detail(song, detail) or changed
+            if changed:
+                save_to_json(path, songs)
+
+
+def find_songs(song_ids, emotions=None):
+    """
+    감정 파일에서 곡 레코드 조회
+
+    Args:
+        song_ids: song_id 리스트
+        emotions: 대상 감정 리스트 (None이면 전체)
+
+    Returns:
+        list: 요청 순서대로 찾은 레코드 (감정 여러 곳에 있으면 처음 찾은 것)
+    """
+    found = {}
+    for emotion_name in emotions or list(EMOTION_GENRES.keys()):
+        for song in load_emotion(emotion_name):
+            found.setdefault(song.get('song_id'), song)
+    return [found[str(song_id)] for song_id in song_ids if str(song_id) in found]
+
+
+def enrich_song_ids(song_ids, emotions=None, session=None):
+    """
+    특정 곡만 즉시 보강 (추천 시 상세 정보가 필요한 곡)
+
+    Args:
+        song_ids: song_id 리스트
+        emotions: 대상 감정 리스트 (None이면 전체)
+        session: requests.Session 객체 (None이면 새로 생성)
+
+    Returns:
+        list: 요청한 곡 레코드 (이미 보강돼 있던 곡 포함, 보강 실패 곡은
+              detail_status가 'pending'으로 남음, 없는 song_id는 제외)
+    """
+    own_session = session is None
+    session = session or create_session()
+    try:
+        enrich(session, emotions, song_ids=song_ids)
+    finally:
+        if own_session:
+            session.close()
+    return find_songs(song_ids, emotions)
+
+
+def start_background(emotions=None, priority=None, batch_size=BATCH_SIZE):
+    """
+    백그라운드 스레드에서 우선순위 순으로 배치 보강
+
+    Returns:
+        tuple: (threading.Thread, threading.Event) - event.set()으로 중단 요청
+    """
+    stop_event = threading.Event()
+
+    def run():
+        session = create_session()
+        try:
+            enrich(session, emotions, priority=priority, batch_size=batch_size,
+                   stop_event=stop_event)
+        finally:
+            session.close()
+
+    thread = threading.Thread(target=run, name="music-enricher", daemon=True)
+    thread.start()
+    return thread, stop_event
+
+
+def print_status(emotions):
+    """감정별 보류 레코드 수 출력"""
+    print("\n" + "="*60)
+    print("상세 정보 보강 현황")
+    print("="*60)
+    for emotion_name in emotions:
+        songs = load_emotion(emotion_name)
+        pending = sum(1 for song in songs if is_pending(song))
+        print(f"  {emotion_name:<12} 전체 {len(songs):>5}곡, 보류 {pending:>5}곡")
+
+
+# ============================================================================
+# 메인 실행
+# ============================================================================
+
+def print_usage():
+    """사용법 출력"""
+    print("""
+사용법:
+  python enrich_music.py joy                          # joy 보류 레코드 전체 보강
+  python enrich_music.py --full                       # 전체 감정 보강
+  python enrich_music.py --full --ids 1325050 ...     # 특정 곡만 즉시 보강
+  python enrich_music.py --full --priority served.json --top 100
+                                                      # 추천 노출 상위 100곡 우선 보강
+  python enrich_music.py --full --status              # 보류 현황
+
+옵션:
+  --ids ID...        보강할 song_id 목록
+  --priority FILE    song_id 리스트 또는 {song_id: 점수} JSON
+  --top N            최대 N곡만 보강
+  --batch N          배치 크기 (기본 20, 배치마다 저장)
+""")
+
+
+def main():
+    """메인 함수"""
+    import argparse
+
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('emotions', nargs='*')
+    parser.add_argument('--full', action='store_true')
+    parser.add_argument('--ids', nargs='+')
+    parser.add_argument('--priority')
+    parser.add_argument('--top', type=int)
+    parser.add_argument('--batch', type=int, default=BATCH_SIZE)
+    parser.add_argument('--status', action='store_true')
+    args = parser.parse_args()
+
+    emotions = list(EMOTION_GENRES.keys()) if args.full else args.emotions
+    if not emotions:
+        print_usage()
+        return
+
+    invalid_emotions = [e for e in emotions if e not in EMOTION_GENRES]
+    if invalid_emotions:
+        print(f"\n[ERROR] 잘못된 감정: {', '.join(invalid_emotions)}")
+        print_usage()
+        return
+
+    if args.status:
+        print_status(emotions)
+        return
+
+    priority = load_priority(args.priority) if args.priority else None
+
+    session = create_session()
+    try:
+        enrich(session, emotions, song_ids=args.ids, priority=priority,
+               limit=args.top, batch_size=args.batch)
+    except KeyboardInterrupt:
+        print("\n\n보강이 중단되었습니다. (마지막 배치까지 저장됨)")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
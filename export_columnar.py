@@ -0,0 +1,419 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar export of crawl results (Parquet / Arrow IPC)
+Partitioned by source and emotion, with a projection/predicate loader and a JSON comparison benchmark
+"""
+
+import json
+import os
+import random
+import shutil
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+except ImportError:  # optional dependency: pip install -r requirements-optional.txt
+    pa = pc = ds = None
+
+
+# ==================== Configuration ====================
+
+# Source name -> JSON directory written by crawl_books.py / crawl_music.py
+SOURCE_DIRS = {
+    'books': os.path.join('data', 'books'),
+    'musics': os.path.join('data', 'musics'),
+}
+
+COLUMNAR_DIR = os.path.join('data', 'columnar')
+
+# List column holding tags for each source (used by the tag predicate)
+TAG_COLUMNS = {
+    'books': 'tags',
+    'musics': 'dj_tags',
+}
+
+FORMATS = {
+    'parquet': 'parquet',
+    'arrow': 'ipc',
+}
+
+EMOTIONS = ['joy', 'excitement', 'normal', 'sadness', 'anxiety', 'anger']
+
+
+def require_pyarrow():
+    """Raise a helpful error when the optional pyarrow dependency is missing"""
+    if pa is None:
+        raise ImportError("pyarrow is required for columnar export: pip install -r requirements-optional.txt")
+
+
+def schema(source):
+    """
+    Arrow schema per source
+
+    Repeated strings (author, publisher, artist, genre, ...) are dictionary
+    encoded; tags / dj_tags are list<string> columns.
+    """
+    require_pyarrow()
+    dict_string = pa.dictionary(pa.int32(), pa.string())
+
+    if source == 'books':
+        return pa.schema([
+            ('product_id', pa.string()),
+            ('isbn', pa.string()),
+            ('title', pa.string()),
+            ('author', dict_string),
+            ('publisher', dict_string),
+            ('pub_date', pa.string()),
+            ('subtitle', pa.string()),
+            ('price', pa.string()),
+            ('tags', pa.list_(pa.string())),
+            ('detail_url', pa.string()),
+            ('cover_image_url', pa.string()),
+        ])
+
+    if source == 'musics':
+        return pa.schema([
+            ('song_id', pa.string()),
+            ('title', pa.string()),
+            ('artist', dict_string),
+            ('album', pa.string()),
+            ('cover_url', pa.string()),
+            ('detail_url', pa.string()),
+            ('genre', dict_string),
+            ('dj_tags', pa.list_(pa.string())),
+            # list-only / refresh daemon records
+            ('genre_codes', pa.list_(pa.string())),
+            ('detail_status', dict_string),
+        ])
+
+    raise ValueError(f"Unknown source: {source}")
+
+
+# ==================== Export ====================
+
+def records_to_table(records, source, emotion):
+    """
+    Convert crawl records to an Arrow table with an 'emotion' partition column
+
+    Args:
+        records (list): Book or song dictionaries
+        source (str): 'books' or 'musics'
+        emotion (str): Emotion name
+
+    Returns:
+        pyarrow.Table
+    """
+    target = schema(source)
+    columns = {name: [record.get(name) for record in records] for name in target.names}
+    table = pa.Table.from_pydict(columns, schema=target)
+    return table.append_column('emotion', pa.array([emotion] * len(records), pa.string()))
+
+
+def export_source(source, json_dir=None, output_dir=COLUMNAR_DIR, fmt='parquet'):
+    """
+    Export one source's per-emotion JSON files as a dataset partitioned by emotion
+
+    Layout: <output_dir>/source=<source>/emotion=<emotion>/part-0.<ext>
+    (the whole source directory is replaced on every export)
+
+    Args:
+        source (str): 'books' or 'musics'
+        json_dir (str): Directory with <emotion>.json files (default: SOURCE_DIRS)
+        output_dir (str): Dataset root
+        fmt (str): 'parquet' or 'arrow'
+
+    Returns:
+        int: Number of exported records
+    """
+    require_pyarrow()
+    json_dir = json_dir or SOURCE_DIRS[source]
+
+    tables = []
+    for emotion in EMOTIONS:
+        filepath = os.path.join(json_dir, f"{emotion}.json")
+        if not os.path.exists(filepath):
+            continue
+        with open(filepath, encoding='utf-8') as f:
+            tables.append(records_to_table(json.load(f), source, emotion))
+
+    if not tables:
+        print(f"[WARN] No JSON files found in {json_dir}")
+        return 0
+
+    table = pa.concat_tables(tables, promote_options='permissive')
+
+    # Write a fresh copy and swap it in, so partitions of emptied or removed
+    # emotions do not linger. Readers never see a half-written dataset, but
+    # source=<s> is briefly missing between the two renames (retry on a miss).
+    target_dir = os.path.join(output_dir, f"source={source}")
+    tmp_dir = os.path.join(output_dir, f".source={source}.{os.getpid()}.tmp")
+    old_dir = os.path.join(output_dir, f".source={source}.{os.getpid()}.old")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        ds.write_dataset(
+            table,
+            tmp_dir,
+            format=FORMATS[fmt],
+            partitioning=['emotion'],
+            partitioning_flavor='hive',
+            existing_data_behavior='overwrite_or_ignore',
+        )
+        if os.path.exists(target_dir):
+            os.replace(target_dir, old_dir)
+        os.replace(tmp_dir, target_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    print(f"[OK] Exported {table.num_rows} {source} records to {output_dir} ({fmt})")
+    return table.num_rows
+
+
+def export_all(output_dir=COLUMNAR_DIR, fmt='parquet', json_dirs=None):
+    """Export books and musics; json_dirs overrides SOURCE_DIRS per source"""
+    json_dirs = json_dirs or {}
+    return {source: export_source(source, json_dirs.get(source), output_dir, fmt)
+            for source in SOURCE_DIRS}
+
+
+# ==================== Loader ====================
+
+def _tag_mask(table, column, tags):
+    """Boolean mask of rows whose list column contains any of the tags"""
+    values = table.column(column).combine_chunks()
+    flat = pc.list_flatten(values)
+    parents = pc.list_parent_indices(values)
+    matched_rows = pc.unique(pc.filter(parents, pc.is_in(flat, value_set=pa.array(tags, pa.string()))))
+    return pc.is_in(pa.array(range(table.num_rows), pa.int64()), value_set=matched_rows.cast(pa.int64()))
+
+
+def load(source, columns=None, emotions=None, tags=None, base_dir=COLUMNAR_DIR, fmt='parquet'):
+    """
+    Load an exported dataset with column projection and emotion/tag predicates
+
+    Emotion filters prune whole partitions, so unrelated files are never read.
+
+    Args:
+        source (str): 'books' or 'musics'
+        columns (list): Columns to read (None = all, 'emotion' included as partition column)
+        emotions (list): Keep only these emotions
+        tags (list): Keep rows whose tags / dj_tags contain any of these
+        base_dir (str): Dataset root
+        fmt (str): 'parquet' or 'arrow'
+
+    Returns:
+        pyarrow.Table (use .to_pylist() for dictionaries, .to_pandas() for a DataFrame)
+    """
+    require_pyarrow()
+    # Explicit schema: an export with no rows has no files to infer columns from
+    dataset = ds.dataset(os.path.join(base_dir, f"source={source}"), format=FORMATS[fmt],
+                         partitioning='hive', schema=schema(source).append(pa.field('emotion', pa.string())))
+
+    expression = ds.field('emotion').isin(emotions) if emotions else None
+
+    tag_column = TAG_COLUMNS[source]
+    read_columns = columns
+    if tags and columns is not None and tag_column not in columns:
+        read_columns = list(columns) + [tag_column]
+
+    table = dataset.to_table(columns=read_columns, filter=expression)
+
+    if tags:
+        table = table.filter(_tag_mask(table, tag_column, tags))
+        if columns is not None and tag_column not in columns:
+            table = table.drop_columns([tag_column])
+
+    return table
+
+
+def load_json(source, emotions=None, json_dir=None):
+    """Baseline loader: parse the per-emotion JSON files into a list of dictionaries"""
+    json_dir = json_dir or SOURCE_DIRS[source]
+    records = []
+    for emotion in emotions or EMOTIONS:
+        filepath = os.path.join(json_dir, f"{emotion}.json")
+        if os.path.exists(filepath):
+            with open(filepath, encoding='utf-8') as f:
+                for record in json.load(f):
+                    record['emotion'] = emotion
+                    records.append(record)
+    return records
+
+
+# ==================== Benchmark ====================
+
+def generate_synthetic(json_dirs, total_records, seed=42):
+    """
+    Write synthetic books/songs JSON files in the crawler output format
+
+    Half the records are books and half are songs, spread evenly over emotions.
+    """
+    rng = random.Random(seed)
+    per_file = max(1, total_records // (2 * len(EMOTIONS)))
+    tag_pool = [f"태그{i}" for i in range(300)]
+    publishers = [f"출판사 {i}" for i in range(500)]
+    artists = [f"아티스트 {i}" for i in range(3000)]
+    genres = ['발라드', '댄스', '랩/힙합', 'R&B/Soul', '인디음악', '록/메탈', '포크/블루스', 'POP', 'OST']
+
+    for source, json_dir in json_dirs.items():
+        os.makedirs(json_dir, exist_ok=True)
+        for e, emotion in enumerate(EMOTIONS):
+            records = []
+            for i in range(per_file):
+                n = e * per_file + i
+                if source == 'books':
+                    isbn = f"979{n:010d}"
+                    records.append({
+                        'product_id': f"S{n:012d}",
+                        'isbn': isbn,
+                        'title': f"책 제목 {n}",
+                        'author': f"저자 {rng.randrange(20000)}",
+                        'publisher': rng.choice(publishers),
+                        'pub_date': f"20{rng.randrange(10, 25)}년 {rng.randrange(1, 13):02d}월 {rng.randrange(1, 29):02d}일",
+                        'subtitle': '',
+                        'price': f"{rng.randrange(8, 40) * 1000:,}원",
+                        'tags': rng.sample(tag_pool, rng.randrange(0, 10)),
+                        'detail_url': f"https://product.kyobobook.co.kr/detail/S{n:012d}",
+                        'cover_image_url': f"https://contents.kyobobook.co.kr/sih/fit-in/300x0/pdt/{isbn}.jpg",
+                    })
+                else:
+                    song_id = str(1000000 + n)
+                    records.append({
+                        'song_id': song_id,
+                        'title': f"곡 제목 {n}",
+                        'artist': rng.choice(artists),
+                        'album': f"앨범 {rng.randrange(50000)}",
+                        'cover_url': f"https://cdnimg.melon.co.kr/cm/album/images/{song_id}_500.jpg/melon/resize/180/quality/100/optimize",
+                        'detail_url': f"https://www.melon.com/song/detail.htm?songId={song_id}",
+                        'genre': rng.choice(genres),
+                        'dj_tags': [f"#{t}" for t in rng.sample(tag_pool, rng.randrange(0, 6))],
+                    })
+            with open(os.path.join(json_dir, f"{emotion}.json"), 'w', encoding='utf-8') as f:
+                json.dump(records, f, ensure_ascii=False, indent=2)
+
+
+def _bench_case(case, root, fmt):
+    """Run one benchmark case (in a fresh process) and return (seconds, rows, peak RSS MB)"""
+    json_dirs = {source: os.path.join(root, 'json', source) for source in SOURCE_DIRS}
+    base_dir = os.path.join(root, 'columnar')
+
+    start = time.perf_counter()
+    if case == 'json: full load':
+        rows = sum(len(load_json(s, json_dir=json_dirs[s])) for s in SOURCE_DIRS)
+    elif case == 'json: project title+tags':
+        rows = 0
+        for source in SOURCE_DIRS:
+            tag_column = TAG_COLUMNS[source]
+            rows += len([(r['title'], r[tag_column]) for r in load_json(source, json_dir=json_dirs[source])])
+    elif case == 'json: joy + tag filter':
+        records = load_json('musics', ['joy'], json_dir=json_dirs['musics'])
+        rows = len([r for r in records if '#태그7' in r['dj_tags']])
+    elif case == 'columnar: full load':
+        rows = sum(load(s, base_dir=base_dir, fmt=fmt).num_rows for s in SOURCE_DIRS)
+    elif case == 'columnar: project title+tags':
+        rows = sum(load(s, columns=['title', TAG_COLUMNS[s]], base_dir=base_dir, fmt=fmt).num_rows
+                   for s in SOURCE_DIRS)
+    elif case == 'columnar: joy + tag filter':
+        rows = load('musics', columns=['song_id', 'title'], emotions=['joy'], tags=['#태그7'],
+                    base_dir=base_dir, fmt=fmt).num_rows
+    else:
+        raise ValueError(case)
+    elapsed = time.perf_counter() - start
+
+    return elapsed, rows, _peak_rss_mb()
+
+
+def _peak_rss_mb():
+    """Peak RSS of this process in MB (None if the platform does not expose it)"""
+    # VmHWM resets on exec; ru_maxrss on Linux keeps the parent's peak across spawn
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if os.uname().sysname == 'Darwin' else peak / 1024
+    except ImportError:  # Windows
+        return None
+
+
+BENCH_CASES = [
+    'json: full load',
+    'columnar: full load',
+    'json: project title+tags',
+    'columnar: project title+tags',
+    'json: joy + tag filter',
+    'columnar: joy + tag filter',
+]
+
+
+def benchmark(root, total_records, fmt='parquet'):
+    """
+    Compare JSON vs columnar load time and peak memory on a synthetic dataset
+
+    Each case runs in a separate spawned process so peak RSS is not shared.
+    """
+    import multiprocessing
+
+    require_pyarrow()
+    json_dirs = {source: os.path.join(root, 'json', source) for source in SOURCE_DIRS}
+
+    print(f"[INFO] Generating {total_records:,} synthetic records in {root} ...")
+    generate_synthetic(json_dirs, total_records)
+    export_all(os.path.join(root, 'columnar'), fmt, json_dirs)
+
+    json_bytes = sum(os.path.getsize(os.path.join(d, f)) for d in json_dirs.values() for f in os.listdir(d))
+    columnar_bytes = sum(os.path.getsize(os.path.join(dirpath, f))
+                         for dirpath, _, files in os.walk(os.path.join(root, 'columnar')) for f in files)
+
+    ctx = multiprocessing.get_context('spawn')
+    print("\n" + "=" * 72)
+    print(f"JSON {json_bytes / 1024 / 1024:.1f} MB vs {fmt} {columnar_bytes / 1024 / 1024:.1f} MB on disk")
+    print("=" * 72)
+    print(f"{'case':<32}{'seconds':>10}{'rows':>12}{'peak RSS(MB)':>16}")
+    print("-" * 72)
+    with ctx.Pool(1, maxtasksperchild=1) as pool:
+        for case in BENCH_CASES:
+            elapsed, rows, peak_mb = pool.apply(_bench_case, (case, root, fmt))
+            peak = f"{peak_mb:.1f}" if peak_mb is not None else '-'
+            print(f"{case:<32}{elapsed:>10.2f}{rows:>12,}{peak:>16}")
+    print("=" * 72)
+
+
+# ==================== Main Execution ====================
+
+def main():
+    """Main execution function"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Columnar (Parquet / Arrow IPC) export of crawl results')
+    sub = parser.add_subparsers(dest='command')
+
+    export_parser = sub.add_parser('export', help='Export data/books and data/musics')
+    export_parser.add_argument('--format', choices=list(FORMATS), default='parquet')
+    export_parser.add_argument('--output', default=COLUMNAR_DIR)
+
+    bench_parser = sub.add_parser('bench', help='JSON vs columnar load benchmark on synthetic data')
+    bench_parser.add_argument('--records', type=int, default=1_000_000)
+    bench_parser.add_argument('--format', choices=list(FORMATS), default='parquet')
+    bench_parser.add_argument('--dir', default=os.path.join('data', 'bench_columnar'))
+
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        export_all(args.output, args.format)
+    elif args.command == 'bench':
+        benchmark(args.dir, args.records, args.format)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Crash-safe JSON files shared between crawler processes
+Atomic writes (temp file + os.replace) and an exclusive lock for load/merge/save
+"""
+
+import contextlib
+import json
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks only serialize threads within the process
+    fcntl = None
+
+
+# Per-path thread locks (flock alone does not order threads sharing one lock file handle)
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _thread_lock(filepath):
+    key = os.path.abspath(filepath)
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(key, threading.Lock())
+
+
+@contextlib.contextmanager
+def locked(filepath):
+    """
+    Exclusive lock for a read-merge-write cycle on filepath
+
+    Held across threads and processes via a sibling '<file>.lock' file, so two
+    workers merging into the same emotion file never overwrite each other.
+
+    Usage:
+        with locked(path):
+            data = load(path)
+            ...
+            write_json_atomic(path, data)
+    """
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with _thread_lock(filepath):
+        with open(f"{filepath}.lock", 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _file_mode(filepath):
+    """Mode for a rewritten file: keep the existing one, else what open() would create"""
+    try:
+        return os.stat(filepath).st_mode & 0o7777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def write_json_atomic(filepath, data):
+    """
+    Write data as JSON so readers see either the old or the new file, never a truncated one
+
+    The file keeps its previous permissions (mkstemp would otherwise leave it 0600,
+    unreadable for other users such as the recommender service).
+    Raises on failure (the original file is left untouched).
+    """
+    directory = os.path.dirname(filepath) or '.'
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(filepath)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, _file_mode(filepath))
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,444 @@
+# -*- coding: utf-8 -*-
+"""
+Local mock Kyobo/Melon server
+Serves Kyobo search pages and Melon list/detail pages for offline benchmarks
+"""
+
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+# ==================== Configuration ====================
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Recorded page file names looked up in --fixtures DIR
+FIXTURE_FILES = {
+    'kyobo_search': 'kyobo_search.html',
+    'melon_list': 'melon_list.html',
+    'melon_detail': 'melon_detail.html',
+}
+
+# Filler appended to synthetic detail pages (real pages are ~100KB)
+DETAIL_PADDING_BYTES = 80000
+
+
+# ==================== Latency Distributions ====================
+
+def parse_latency(spec):
+    """
+    Build a latency sampler from a spec string
+
+    Args:
+        spec (str): 'fixed:S', 'uniform:LO,HI', 'lognormal:MU,SIGMA' or 'exp:MEAN' (seconds)
+
+    Returns:
+        callable: Function returning a latency in seconds
+    """
+    kind, _, params = spec.partition(':')
+    try:
+        values = [float(v) for v in params.split(',')] if params else []
+    except ValueError:
+        raise ValueError(f"Invalid latency parameters: {spec}") from None
+
+    # Distribution -> (accepted parameter counts, sampler)
+    distributions = {
+        'fixed': ((0, 1), lambda: values[0] if values else 0.0),
+        'uniform': ((2,), lambda: random.uniform(values[0], values[1])),
+        'lognormal': ((2,), lambda: random.lognormvariate(values[0], values[1])),
+        'exp': ((1,), lambda: random.expovariate(1.0 / values[0])),
+    }
+    if kind not in distributions:
+        raise ValueError(f"Unknown latency distribution: {spec}")
+
+    counts, sampler = distributions[kind]
+    if len(values) not in counts:
+        raise ValueError(f"Latency '{kind}' takes {' or '.join(map(str, counts))} parameter(s): {spec}")
+    if kind == 'exp' and values[0] <= 0:
+        raise ValueError(f"Latency 'exp' mean must be positive: {spec}")
+    return sampler
+
+
+# ==================== Synthetic Pages ====================
+
+def _stable_id(*parts, digits=13):
+    """Deterministic numeric ID so repeated requests return the same items"""
+    digest = hashlib.md5('|'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+    return str(int(digest, 16))[:digits]
+
+
+def render_kyobo_search(keyword, page, items_per_page):
+    """
+    Render a Kyobo search result page matching crawl_books.parse_book_item selectors
+
+    Item IDs depend on keyword and page only, so 'best' and 'sale' sorts
+    overlap like they do on the real site and deduplication has work to do.
+    """
+    rows = []
+    for idx in range(items_per_page):
+        isbn = '979' + _stable_id(keyword, page, idx, digits=10)
+        pid = 'S' + _stable_id('pid', isbn, digits=12)
+        rows.append(f"""
+<li class="prod_item">
+  <input type="checkbox" class="result_checkbox" data-pid="{pid}" data-bid="{isbn}">
+  <div class="prod_info_box">
+    <a class="prod_info" href="https://product.kyobobook.co.kr/detail/{pid}">
+      <span id="cmdtName_{pid}">{keyword} 책 {page}-{idx}</span>
+    </a>
+    <div class="prod_desc_info"><span class="prod_desc">부제목 {idx}</span></div>
+    <div class="prod_author_info"><a class="author rep" href="#">저자 {idx % 7}</a></div>
+    <div class="prod_publish"><a class="text" href="#">출판사 {idx % 5}</a><span class="date">2024년 01월 {idx % 28 + 1:02d}일</span></div>
+    <div class="prod_price"><span class="price_normal"><s class="val">{12000 + idx * 100:,}원</s></span></div>
+    <div class="tag_wrap size_sm"><a class="tag" href="#">#{keyword}</a><a class="tag" href="#">#태그{idx % 9}</a></div>
+  </div>
+</li>""")
+
+    return f"""<!DOCTYPE html>
+<html lang="ko"><head><meta charset="utf-8"><title>{keyword} - 교보문고</title></head>
+<body><div class="search_result"><ul class="prod_list">{''.join(rows)}
+</ul></div></body></html>"""
+
+
+def render_melon_list(genre_code, start_index, page_size, total_songs):
+    """Render a Melon song_listPaging.htm fragment (tbody > tr rows)"""
+    rows = []
+    end_index = min(start_index + page_size - 1, total_songs)
+    for rank in range(start_index, end_index + 1):
+        song_id = _stable_id(genre_code, rank, digits=8)
+        rows.append(f"""
+<tr>
+  <td><input type="checkbox" class="input_check" value="{song_id}"></td>
+  <td><a href="#" class="image_typeAll"><img src="https://cdnimg.melon.co.kr/cm/album/images/{song_id}_500.jpg/melon/resize/120/quality/80/optimize" width="60" height="60"></a></td>
+  <td><div class="wrap_song_info">
+    <div class="ellipsis rank01"><span><a href="#">곡 {genre_code}-{rank}</a></span></div>
+    <div class="ellipsis rank02"><a href="#">아티스트 {rank % 40}</a></div>
+    <div class="ellipsis rank03"><a href="#">앨범 {rank % 60}</a></div>
+  </div></td>
+</tr>""")
+
+    return f"""<table><thead><tr><th>곡정보</th></tr></thead>
+<tbody>{''.join(rows)}
+</tbody></table>"""
+
+
+def render_melon_detail(song_id, padding_bytes=DETAIL_PADDING_BYTES):
+    """Render a Melon song/detail.htm page with the genre/tag block near the top"""
+    tags = ''.join(f'<a href="#" class="tag_item">#태그{(int(song_id) + i) % 30}</a>' for i in range(4))
+    filler = ('<p class="lyric_line">가사 가사 가사 가사 가사 가사 가사 가사</p>\n'
+              * (padding_bytes // 60 + 1))
+
+    return f"""<!DOCTYPE html>
+<html lang="ko"><head><meta charset="utf-8"><title>곡 {song_id} - 멜론</title></head>
+<body>
+<div id="conts">
+  <div class="section_info">
+    <div class="song_name">곡 {song_id}</div>
+    <div class="meta"><dl class="list">
+      <dt>앨범</dt><dd>앨범 {song_id}</dd>
+      <dt>발매일</dt><dd>2024.01.01</dd>
+      <dt>장르</dt><dd>댄스, 댄스</dd>
+    </dl></div>
+  </div>
+  <div class="section_tag"><div class="tag_list">{tags}</div></div>
+  <div class="section_lyric"><div class="lyric" id="d_video_summary">
+{filler}
+  </div></div>
+  <div class="section_cmt"><div id="d_cmtpgn_cmt_list_wrapper"></div></div>
+</div>
+</body></html>"""
+
+
+# ==================== Server ====================
+
+class MockServerStats:
+    """Thread-safe request log used to verify rate-limit compliance"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.routes = Counter()
+            self.statuses = Counter()
+            self.bytes_sent = 0
+            self.timestamps = []
+
+    def record(self, route, status, size):
+        with self.lock:
+            self.routes[route] += 1
+            self.statuses[status] += 1
+            self.bytes_sent += size
+            self.timestamps.append(time.monotonic())
+
+    def snapshot(self):
+        """
+        Summarize requests seen so far
+
+        Returns:
+            dict: Request counts, status counts, min inter-arrival gap and peak req/s
+        """
+        with self.lock:
+            stamps = sorted(self.timestamps)
+            routes = dict(self.routes)
+            statuses = {str(k): v for k, v in self.statuses.items()}
+            bytes_sent = self.bytes_sent
+
+        min_gap = None
+        if len(stamps) > 1:
+            min_gap = min(b - a for a, b in zip(stamps, stamps[1:]))
+
+        # Peak number of requests in any sliding 1-second window
+        peak_rps = 0
+        window = deque()
+        for ts in stamps:
+            window.append(ts)
+            while window[0] < ts - 1.0:
+                window.popleft()
+            peak_rps = max(peak_rps, len(window))
+
+        return {
+            'requests': len(stamps),
+            'routes': routes,
+            'statuses': statuses,
+            'bytes_sent': bytes_sent,
+            'min_gap_seconds': min_gap,
+            'peak_rps': peak_rps,
+        }
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    """Ignores clients closing the connection early (streaming early-abort)"""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Routes Kyobo/Melon URL shapes to synthetic or recorded pages"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+    def do_GET(self):
+        config = self.server.config
+        parsed = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        route = parsed.path
+
+        if route == '/__stats':
+            self._send(200, json.dumps(self.server.stats.snapshot()), 'application/json', record=False)
+            return
+
+        time.sleep(max(0.0, config['latency']()))
+
+        # Error / throttling injection
+        roll = random.random()
+        if roll < config['throttle_rate'] or self._over_rate_limit():
+            self._send(429, 'Too Many Requests', headers={'Retry-After': str(config['retry_after'])})
+            return
+        if roll < config['throttle_rate'] + config['error_rate']:
+            self._send(500, 'Internal Server Error')
+            return
+
+        if route == '/search':
+            page = int(query.get('page', '1'))
+            if page > config['kyobo_pages']:
+                body = render_kyobo_search(query.get('keyword', ''), page, 0)
+            else:
+                body = self._fixture('kyobo_search') or render_kyobo_search(
+                    query.get('keyword', ''), page, config['kyobo_items_per_page'])
+            self._send(200, body)
+        elif route == '/genre/song_listPaging.htm':
+            start_index = int(query.get('startIndex', '1'))
+            page_size = int(query.get('pageSize', '50'))
+            if start_index > config['melon_songs_per_genre']:
+                body = render_melon_list(query.get('gnrCode', ''), start_index, page_size, 0)
+            else:
+                body = self._fixture('melon_list') or render_melon_list(
+                    query.get('gnrCode', ''), start_index, page_size, config['melon_songs_per_genre'])
+            self._send(200, body)
+        elif route == '/song/detail.htm':
+            body = self._fixture('melon_detail') or render_melon_detail(
+                query.get('songId', '0'), config['detail_padding_bytes'])
+            self._send(200, body)
+        else:
+            self._send(404, 'Not Found')
+
+    def _over_rate_limit(self):
+        """Server-side rate limit: 429 when the last second already saw max_rps requests"""
+        max_rps = self.server.config['max_rps']
+        if not max_rps:
+            return False
+        now = time.monotonic()
+        with self.server.window_lock:
+            window = self.server.window
+            while window and window[0] < now - 1.0:
+                window.popleft()
+            if len(window) >= max_rps:
+                return True
+            window.append(now)
+        return False
+
+    def _fixture(self, name):
+        fixtures = self.server.fixtures
+        return fixtures.get(name) if fixtures else None
+
+    def _send(self, status, body, content_type='text/html; charset=utf-8', headers=None, record=True):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+        if record:
+            self.server.stats.record(urlparse(self.path).path, status, len(data))
+
+
+class MockServer:
+    """
+    Local stand-in for search.kyobobook.co.kr and www.melon.com
+
+    Usage:
+        with MockServer(latency='uniform:0.01,0.05') as server:
+            crawl_books.KYOBO_SEARCH_BASE_URL = server.url
+            crawl_music.MELON_BASE_URL = server.url
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=0, latency='fixed:0', error_rate=0.0,
+                 throttle_rate=0.0, max_rps=0, retry_after=1, kyobo_pages=3,
+                 kyobo_items_per_page=20, melon_songs_per_genre=500,
+                 detail_padding_bytes=DETAIL_PADDING_BYTES, fixtures_dir=None):
+        latency_sampler = parse_latency(latency)  # fail before binding the port
+        self.httpd = _QuietHTTPServer((host, port), MockHandler)
+        self.httpd.config = {
+            'latency': latency_sampler,
+            'error_rate': error_rate,
+            'throttle_rate': throttle_rate,
+            'max_rps': max_rps,
+            'retry_after': retry_after,
+            'kyobo_pages': kyobo_pages,
+            'kyobo_items_per_page': kyobo_items_per_page,
+            'melon_songs_per_genre': melon_songs_per_genre,
+            'detail_padding_bytes': detail_padding_bytes,
+        }
+        self.httpd.stats = MockServerStats()
+        self.httpd.window = deque()
+        self.httpd.window_lock = threading.Lock()
+        self.httpd.fixtures = load_fixtures(fixtures_dir) if fixtures_dir else None
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def stats(self):
+        return self.httpd.stats
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def load_fixtures(fixtures_dir):
+    """
+    Load recorded pages from a directory
+
+    Args:
+        fixtures_dir (str): Directory containing any of FIXTURE_FILES
+
+    Returns:
+        dict: Page name -> HTML text (missing files fall back to synthetic pages)
+    """
+    fixtures = {}
+    for name, filename in FIXTURE_FILES.items():
+        path = os.path.join(fixtures_dir, filename)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                fixtures[name] = f.read()
+    return fixtures
+
+
+# ==================== Main Execution ====================
+
+def main():
+    """Run the mock server in the foreground"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Local mock Kyobo/Melon server')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--latency', default='fixed:0',
+                        help="fixed:S | uniform:LO,HI | lognormal:MU,SIGMA | exp:MEAN")
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of HTTP 500 responses')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of HTTP 429 responses')
+    parser.add_argument('--max-rps', type=int, default=0, help='Return 429 above this many requests/second (0 = off)')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds sent with 429 responses')
+    parser.add_argument('--kyobo-pages', type=int, default=3)
+    parser.add_argument('--kyobo-items-per-page', type=int, default=20)
+    parser.add_argument('--melon-songs-per-genre', type=int, default=500)
+    parser.add_argument('--detail-padding-bytes', type=int, default=DETAIL_PADDING_BYTES,
+                        help='Filler appended to synthetic detail pages')
+    parser.add_argument('--fixtures', default=None, help='Directory with recorded pages')
+    args = parser.parse_args()
+
+    try:
+        parse_latency(args.latency)
+    except ValueError as e:
+        parser.error(str(e))
+
+    server = MockServer(args.host, args.port, args.latency, args.error_rate, args.throttle_rate,
+                        args.max_rps, retry_after=args.retry_after, kyobo_pages=args.kyobo_pages,
+                        kyobo_items_per_page=args.kyobo_items_per_page,
+                        melon_songs_per_genre=args.melon_songs_per_genre,
+                        detail_padding_bytes=args.detail_padding_bytes,
+                        fixtures_dir=args.fixtures)
+
+    print("=" * 60)
+    print(f"Mock server listening on {server.url}")
+    print(f"  KYOBO_SEARCH_BASE_URL={server.url}")
+    print(f"  MELON_BASE_URL={server.url}")
+    print(f"  Stats: {server.url}/__stats")
+    print("=" * 60)
+
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[DONE] Mock server stopped")
+        print(json.dumps(server.stats.snapshot(), ensure_ascii=False, indent=2))
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+Per-stage profiling for the crawlers (--profile)
+cProfile + tracemalloc per stage, sampled collapsed stacks, wall/CPU/sleep breakdown
+"""
+
+import contextlib
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+
+
+# ==================== Configuration ====================
+
+PROFILE_DIR = "profile"
+
+# Take a tracemalloc snapshot pair on every Nth entry of a stage
+ALLOC_SAMPLE_EVERY = 25
+ALLOC_TOP_N = 25
+
+# Stack sampling interval for the collapsed-stack file (seconds)
+SAMPLE_INTERVAL = 0.005
+
+# Returned by stage() while profiling is disabled (nullcontext is reusable)
+_NULL_STAGE = contextlib.nullcontext()
+
+_profiler = None
+
+
+# ==================== Public API ====================
+
+def stage(name):
+    """
+    Context manager marking a crawl stage (fetch, parse, dedup, detail, save, sleep)
+
+    Nested stages are reported by path, e.g. 'detail/fetch'. When profiling is
+    disabled this returns a shared no-op context, so the hooks cost one global
+    lookup and a None check. Only the thread that called enable() is profiled;
+    stages entered from other threads (benchmark workers, background enrichment)
+    get the no-op context so they cannot corrupt the stage stack.
+
+    Args:
+        name (str): Stage name
+    """
+    profiler = _profiler
+    if profiler is None or threading.get_ident() != profiler.thread_id:
+        return _NULL_STAGE
+    return profiler.stage(name)
+
+
+def enable(tool_name, base_dir=PROFILE_DIR):
+    """
+    Start profiling the calling thread
+
+    Args:
+        tool_name (str): Prefix for the output directory (e.g. 'books', 'music')
+        base_dir (str): Parent directory for profile outputs
+
+    Returns:
+        StageProfiler: Active profiler
+    """
+    global _profiler
+    output_dir = os.path.join(base_dir, f"{tool_name}-{time.strftime('%Y%m%d-%H%M%S')}")
+    _profiler = StageProfiler(output_dir)
+    _profiler.start()
+    return _profiler
+
+
+def finish():
+    """Stop profiling, write reports and print the breakdown (no-op when disabled)"""
+    global _profiler
+    if _profiler is None:
+        return
+    profiler, _profiler = _profiler, None
+    profiler.stop()
+    profiler.write_reports()
+    profiler.print_summary()
+
+
+# ==================== Profiler ====================
+
+class _StageStats:
+    """Accumulated numbers for one stage path"""
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0  # exclusive of nested stages
+        self.cpu = 0.0
+        self.profile = cProfile.Profile()
+        self.alloc_sites = Counter()
+
+
+class StageProfiler:
+    """Profiles named stages on a single thread (the one that created it, see stage())"""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.stages = defaultdict(_StageStats)
+        self.stack = []  # [path, stats, start_wall, start_cpu, child_wall, child_cpu]
+        self.samples = Counter()
+        self.thread_id = threading.get_ident()
+        self._stop_sampler = threading.Event()
+        self._sampler = None
+        self.start_wall = self.start_cpu = None
+        self.total_wall = self.total_cpu = 0.0
+        self.peak_memory = 0
+        self.overhead = 0.0
+        self.in_overhead = False  # set while taking/comparing snapshots (sampler tags these 'profiler')
+
+    def start(self):
+        tracemalloc.start()
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self.total_wall = time.perf_counter() - self.start_wall
+        self.total_cpu = time.process_time() - self.start_cpu
+        self._stop_sampler.set()
+        self._sampler.join()
+        _, self.peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        path = f"{self.stack[-1][0]}/{name}" if self.stack else name
+        stats = self.stages[path]
+        stats.calls += 1
+
+        # Only one cProfile can be active: hand over from the parent stage
+        if self.stack:
+            self.stack[-1][1].profile.disable()
+
+        snapshot = None
+        overhead = 0.0
+        if stats.calls % ALLOC_SAMPLE_EVERY == 1 or ALLOC_SAMPLE_EVERY == 1:
+            overhead_start = time.perf_counter()
+            self.in_overhead = True
+            snapshot = tracemalloc.take_snapshot()
+            self.in_overhead = False
+            overhead = time.perf_counter() - overhead_start
+
+        frame = [path, stats, time.perf_counter(), time.process_time(), 0.0, 0.0]
+        self.stack.append(frame)
+        stats.profile.enable()
+        try:
+            yield
+        finally:
+            stats.profile.disable()
+            self.stack.pop()
+
+            wall = time.perf_counter() - frame[2]
+            cpu = time.process_time() - frame[3]
+            stats.wall += wall - frame[4]
+            stats.cpu += cpu - frame[5]
+
+            if snapshot is not None:
+                overhead_start = time.perf_counter()
+                self.in_overhead = True
+                try:
+                    self._record_allocations(stats, snapshot)
+                finally:
+                    self.in_overhead = False
+                overhead += time.perf_counter() - overhead_start
+            self.overhead += overhead
+
+            # Snapshot time is reported separately, not charged to the parent stage
+            if self.stack:
+                parent = self.stack[-1]
+                parent[4] += wall + overhead
+                parent[5] += cpu + overhead  # snapshots are CPU-bound
+                parent[1].profile.enable()
+
+    def _record_allocations(self, stats, before):
+        """Accumulate net allocations by source line between two snapshots"""
+        after = tracemalloc.take_snapshot()
+        for entry in after.compare_to(before, 'lineno'):
+            site = entry.traceback[0]
+            if entry.size_diff > 0 and site.filename != tracemalloc.__file__:
+                stats.alloc_sites[(site.filename, site.lineno)] += entry.size_diff
+
+    def _sample_loop(self):
+        """Sample the profiled thread's Python stack for the collapsed-stack file"""
+        while not self._stop_sampler.wait(SAMPLE_INTERVAL):
+            in_overhead = self.in_overhead
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            frames.reverse()
+
+            # Snapshot work belongs to the profiler, not to the stage that triggered it
+            # (the flag may flip while frames are collected, so also check the frames)
+            stack = list(self.stack)
+            if in_overhead or self.in_overhead or any(f.startswith('tracemalloc.py:') for f in frames):
+                root = 'profiler'
+            else:
+                root = stack[-1][0].replace('/', ';') if stack else 'other'
+            self.samples[f"{root};{';'.join(frames)}"] += 1
+
+    # ==================== Reports ====================
+
+    def write_reports(self):
+        """Write per-stage pstats and allocation reports, collapsed stacks and summary.json"""
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        for path, stats in self.stages.items():
+            filename = path.replace('/', '.')
+            stats.profile.dump_stats(os.path.join(self.output_dir, f"{filename}.pstats"))
+
+            with open(os.path.join(self.output_dir, f"{filename}.alloc.txt"), 'w', encoding='utf-8') as f:
+                f.write(f"# Top allocation sites for stage '{path}' "
+                        f"(sampled 1 in {ALLOC_SAMPLE_EVERY} calls, net bytes)\n")
+                for (filename_, lineno), size in stats.alloc_sites.most_common(ALLOC_TOP_N):
+                    f.write(f"{size / 1024:10.1f} KiB  {filename_}:{lineno}\n")
+
+        with open(os.path.join(self.output_dir, 'stacks.collapsed'), 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+        with open(os.path.join(self.output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+
+    def summary(self):
+        """
+        Wall/CPU/sleep breakdown
+
+        Returns:
+            dict: Totals and exclusive per-stage numbers
+        """
+        sleep = sum(s.wall for path, s in self.stages.items() if path.split('/')[-1] == 'sleep')
+        return {
+            'wall_seconds': round(self.total_wall, 3),
+            'cpu_seconds': round(self.total_cpu, 3),
+            'sleep_seconds': round(sleep, 3),
+            'peak_traced_memory_mb': round(self.peak_memory / 1024 / 1024, 2),
+            'profiler_overhead_seconds': round(self.overhead, 3),
+            'stages': {
+                path: {
+                    'calls': s.calls,
+                    'wall_seconds': round(s.wall, 3),
+                    'cpu_seconds': round(s.cpu, 3),
+                }
+                for path, s in sorted(self.stages.items(), key=lambda item: -item[1].wall)
+            },
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        wall = summary['wall_seconds'] or 1.0
+
+        print("\n" + "=" * 60)
+        print("PROFILE SUMMARY")
+        print("=" * 60)
+        print(f"Wall: {summary['wall_seconds']:.2f}s  CPU: {summary['cpu_seconds']:.2f}s  "
+              f"Sleep: {summary['sleep_seconds']:.2f}s  "
+              f"Peak traced memory: {summary['peak_traced_memory_mb']} MB  "
+              f"(profiler overhead: {summary['profiler_overhead_seconds']:.2f}s)")
+        print(f"\n{'stage':<24}{'calls':>7}{'wall(s)':>10}{'cpu(s)':>10}{'wall%':>8}")
+        for path, s in summary['stages'].items():
+            print(f"{path:<24}{s['calls']:>7}{s['wall_seconds']:>10.2f}{s['cpu_seconds']:>10.2f}"
+                  f"{100 * s['wall_seconds'] / wall:>7.1f}%")
+        print(f"\n[OK] Profile written to {self.output_dir}")
+        print("=" * 60)
@@ -0,0 +1,598 @@
+# -*- coding: utf-8 -*-
+"""
+Refresh daemon for data/books and data/musics
+Staleness-driven recrawl scheduling under a fixed per-source request budget
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import os
+import signal
+import threading
+import time
+from urllib.parse import urlparse
+
+import crawl_books
+import crawl_music
+from json_store import locked, write_json_atomic
+
+
+# ==================== Configuration ====================
+
+STATE_FILE = os.path.join('data', 'refresh_state.json')
+STATS_FILE = os.path.join('data', 'refresh_stats.json')
+
+# Requests per minute per source site (one-shot CLIs: books 2s delay, music 2~5s delay)
+DEFAULT_BUDGETS = {
+    'kyobo': 20,
+    'melon': 15,
+}
+
+# Prior guess of how often each kind of unit changes (seconds), refined by observation
+PRIOR_CHANGE_INTERVAL = {
+    'kyobo': 24 * 3600,            # keyword x sort x page search results
+    'melon_list': 24 * 3600,       # genre steady-seller list page
+    'song_detail': 180 * 24 * 3600,  # genre / DJ tags of a song
+}
+
+# Refresh a unit once the probability it changed since the last fetch reaches this
+STALENESS_TARGET = 0.5
+
+# Bounds on the refresh interval
+MIN_INTERVAL = {
+    'kyobo': 3600,
+    'melon_list': 3600,
+    'song_detail': 7 * 24 * 3600,
+}
+MAX_INTERVAL = 365 * 24 * 3600
+
+RETRY_DELAY = 15 * 60           # first retry after a failed fetch (doubles per consecutive failure)
+MAX_RETRY_DELAY = 24 * 3600     # cap for repeated failures (at least the kind's MIN_INTERVAL)
+THROTTLE_BACKOFF = 60           # first retry after 429 / 5xx (doubles per consecutive failure, up to RETRY_DELAY)
+CHECKPOINT_INTERVAL = 60        # seconds between state/data checkpoints
+STATS_INTERVAL = 300            # seconds between printed freshness summaries
+
+
+# ==================== Fetch Units ====================
+
+def unit_key(kind, *params):
+    """Stable string key for a fetch unit"""
+    return '|'.join([kind] + [str(p) for p in params])
+
+
+def content_hash(data):
+    """Hash of parsed content, used to detect whether a unit actually changed"""
+    payload = json.dumps(data, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def change_rate(unit):
+    """
+    Estimated changes per second for a unit
+
+    Poisson estimate with a prior of one change per PRIOR_CHANGE_INTERVAL:
+    (observed changes + 1) / (observed time span + prior interval)
+    """
+    prior = PRIOR_CHANGE_INTERVAL[unit['kind']]
+    span = (unit['last_fetched'] - unit['first_fetched']) if unit['first_fetched'] else 0.0
+    return (unit['changes'] + 1) / (span + prior)
+
+
+def staleness(unit, now):
+    """Probability that the unit changed since it was last fetched"""
+    if not unit['last_fetched']:
+        return 1.0
+    return 1.0 - math.exp(-change_rate(unit) * (now - unit['last_fetched']))
+
+
+def next_due(unit, now):
+    """Time at which staleness reaches STALENESS_TARGET (clamped to interval bounds)"""
+    if not unit['last_fetched']:
+        return 0.0
+    interval = -math.log(1.0 - STALENESS_TARGET) / change_rate(unit)
+    interval = min(max(interval, MIN_INTERVAL[unit['kind']]), MAX_INTERVAL)
+    return unit['last_fetched'] + interval
+
+
+def retry_delay(unit, throttled):
+    """
+    Exponential backoff after unit['retry_streak'] consecutive failures
+
+    429 / 5xx start at THROTTLE_BACKOFF and stay within RETRY_DELAY; other failures
+    (connection errors, empty pages) start at RETRY_DELAY and grow up to
+    MAX_RETRY_DELAY or the kind's MIN_INTERVAL, whichever is longer.
+    """
+    exponent = min(unit['retry_streak'] - 1, 20)
+    if throttled:
+        return min(RETRY_DELAY, THROTTLE_BACKOFF * 2 ** exponent)
+    return min(max(MAX_RETRY_DELAY, MIN_INTERVAL[unit['kind']]), RETRY_DELAY * 2 ** exponent)
+
+
+# ==================== Data Store ====================
+
+class DataStore:
+    """
+    In-memory copy of the per-emotion JSON files
+
+    Only records the daemon itself changed are written back: flush() locks each
+    file, re-reads it and upserts those records by isbn / song_id, so changes
+    from other writers (enrich_music, incremental and one-shot crawls) are kept.
+    """
+
+    KEY_FIELDS = {'books': 'isbn', 'musics': 'song_id'}
+
+    def __init__(self):
+        self.books = {}   # emotion -> {isbn: book}
+        self.songs = {}   # emotion -> {song_id: song}
+        self.changed = {}  # (source, emotion) -> keys changed since the last flush
+
+        for emotion in crawl_books.EMOTION_KEYWORDS:
+            self.books[emotion] = {book['isbn']: book for book in self._load('books', emotion)}
+        for emotion in crawl_music.EMOTION_GENRES:
+            self.songs[emotion] = {song['song_id']: song for song in self._load('musics', emotion)}
+
+    @staticmethod
+    def path(source, emotion):
+        directory = os.path.join('data', 'books') if source == 'books' else crawl_music.DATA_DIR
+        return os.path.join(directory, f"{emotion}.json")
+
+    def _load(self, source, emotion):
+        if source == 'books':
+            return crawl_books.load_from_json(f"{emotion}.json")
+        return crawl_music.load_from_json(self.path(source, emotion))
+
+    def _records(self, source):
+        return self.books if source == 'books' else self.songs
+
+    def _mark(self, source, emotion, key):
+        self.changed.setdefault((source, emotion), set()).add(key)
+
+    def upsert_books(self, emotion, books):
+        for book in books:
+            self.books[emotion][book['isbn']] = book
+            self._mark('books', emotion, book['isbn'])
+
+    def upsert_songs(self, genre_code, songs):
+        """
+        Merge list-page songs into every emotion that uses this genre
+
+        Returns:
+            list: song_ids that were not stored before (need a detail fetch)
+        """
+        new_ids = []
+        for emotion, genre_codes in crawl_music.EMOTION_GENRES.items():
+            if genre_code not in genre_codes:
+                continue
+            stored = self.songs[emotion]
+            for song in songs:
+                existing = stored.get(song['song_id'])
+                if existing is None:
+                    record = dict(song)
+                    crawl_music.mark_detail_pending(record, [genre_code])
+                    stored[song['song_id']] = record
+                    new_ids.append(song['song_id'])
+                else:
+                    # List fields only; keep genre / dj_tags from the detail page
+                    for field in ('title', 'artist', 'album', 'cover_url'):
+                        existing[field] = song[field]
+                self._mark('musics', emotion, song['song_id'])
+        return sorted(set(new_ids))
+
+    def apply_detail(self, song_id, detail):
+        for emotion, stored in self.songs.items():
+            if song_id in stored:
+                crawl_music.apply_song_detail(stored[song_id], detail)
+                self._mark('musics', emotion, song_id)
+
+    def song_url(self, song_id):
+        for stored in self.songs.values():
+            if song_id in stored:
+                return stored[song_id]['detail_url']
+        return f"{crawl_music.MELON_BASE_URL}/song/detail.htm?songId={song_id}"
+
+    def _merge(self, source, emotion, keys):
+        """Current file contents with the daemon's changed records upserted"""
+        key_field = self.KEY_FIELDS[source]
+        stored = self._records(source)[emotion]
+        on_disk = {record.get(key_field): record for record in self._load(source, emotion)}
+
+        for key in keys:
+            record = stored.get(key)
+            if record is None:
+                continue
+            current = on_disk.get(key)
+            if (source == 'musics' and current and crawl_music.has_detail(current)
+                    and not crawl_music.has_detail(record)):
+                # Enriched by another writer: never downgrade it back to pending
+                record = dict(record, genre=current.get('genre', ''), dj_tags=current.get('dj_tags', []))
+                if 'detail_status' in record:
+                    record['detail_status'] = crawl_music.DETAIL_DONE
+            on_disk[key] = record
+
+        return list(on_disk.values())
+
+    def flush(self):
+        """
+        Write changed records into their emotion files (locked, re-read, atomic)
+
+        Files that fail stay pending for the next flush. Written files are
+        re-read into memory, so the daemon also sees other writers' records.
+
+        Returns:
+            bool: True if every changed file was written
+        """
+        for source, emotion in sorted(self.changed):
+            path = self.path(source, emotion)
+            try:
+                with locked(path):
+                    merged = self._merge(source, emotion, self.changed[(source, emotion)])
+                    if source == 'books':
+                        saved = crawl_books.save_to_json(merged, f"{emotion}.json")
+                    else:
+                        crawl_music.save_to_json(path, merged)
+                        saved = True
+            except Exception as e:
+                print(f"[FAIL] Failed to save {path}: {e}")
+                saved = False
+
+            if saved:
+                key_field = self.KEY_FIELDS[source]
+                self._records(source)[emotion] = {record.get(key_field): record for record in merged}
+                del self.changed[(source, emotion)]
+        return not self.changed
+
+
+# ==================== Daemon ====================
+
+class RefreshDaemon:
+    """
+    Keeps crawl results fresh by refetching the most-likely-stale units first
+
+    Each source site (kyobo, melon) has its own priority queue ordered by due time
+    (when the unit's estimated staleness reaches STALENESS_TARGET) and its own
+    request budget.
+    """
+
+    def __init__(self, budgets=None, emotions=None, state_file=STATE_FILE):
+        self.budgets = dict(DEFAULT_BUDGETS, **(budgets or {}))
+        self.emotions = emotions or list(crawl_books.EMOTION_KEYWORDS)
+        self.state_file = state_file
+        self.stop_event = threading.Event()
+        self.store = DataStore()
+        # No transport retries: one budget slot is exactly one request, 429 / 5xx are rescheduled below
+        self.session = crawl_music.create_session(retry=False)
+        self.session.hooks['response'].append(self._on_response)
+        self.last_response = {}   # host -> (status code, Retry-After seconds)
+        self.units = {}
+        self.queues = {}      # source -> heap of (due, key)
+        self.next_slot = {}   # source -> earliest time for the next request
+        self.fetches = 0
+
+        # Pacing is handled by the per-source budget instead of random_delay()
+        crawl_music.MIN_DELAY = crawl_music.MAX_DELAY = 0
+
+        self.sources = {'kyobo': 'kyobo', 'melon_list': 'melon', 'song_detail': 'melon'}
+        self.hosts = {
+            'kyobo': urlparse(crawl_books.KYOBO_SEARCH_BASE_URL).netloc,
+            'melon': urlparse(crawl_music.MELON_BASE_URL).netloc,
+        }
+        if self.hosts['kyobo'] == self.hosts['melon']:
+            print(f"[WARN] Both sources point at {self.hosts['kyobo']}; it will receive "
+                  f"{self.budgets['kyobo'] + self.budgets['melon']} requests/min combined")
+
+        self._load_state()
+        self._register_units()
+
+    # ---------- state ----------
+
+    def _load_state(self):
+        if os.path.exists(self.state_file):
+            with open(self.state_file, encoding='utf-8') as f:
+                self.units = json.load(f).get('units', {})
+            print(f"[OK] Restored {len(self.units)} units from {self.state_file}")
+
+    def checkpoint(self):
+        """
+        Flush data files, then atomically write scheduler state and stats
+
+        The state is only advanced when every data file was written, so it never
+        claims units are fresh while their data is missing on disk.
+
+        Returns:
+            bool: True if data and state were written
+        """
+        if not self.store.flush():
+            print("[WARN] Data flush failed; keeping the previous scheduler state")
+            return False
+
+        write_json_atomic(self.state_file, {'saved_at': time.time(), 'units': self.units})
+        write_json_atomic(STATS_FILE, self.stats())
+        return True
+
+    def _add_unit(self, kind, params, last_fetched=None):
+        key = unit_key(kind, *params)
+        if key not in self.units:
+            self.units[key] = {
+                'kind': kind,
+                'params': list(params),
+                'first_fetched': last_fetched,
+                'last_fetched': last_fetched,
+                'fetches': 0,
+                'changes': 0,
+                'failures': 0,
+                'retry_streak': 0,
+                'hash': None,
+            }
+        unit = self.units[key]
+        unit['due'] = next_due(unit, time.time())
+        self._schedule(key)
+
+    def _register_units(self):
+        for emotion in self.emotions:
+            for keyword in crawl_books.EMOTION_KEYWORDS[emotion]:
+                for sort_type in crawl_books.SORT_TYPES:
+                    for page in range(1, crawl_books.PAGES_PER_KEYWORD + 1):
+                        self._add_unit('kyobo', (emotion, keyword, sort_type, page))
+
+        genre_codes = sorted({code for emotion in self.emotions for code in crawl_music.EMOTION_GENRES[emotion]})
+        for genre_code in genre_codes:
+            for page in range(1, crawl_music.MAX_PAGES + 1):
+                self._add_unit('melon_list', (genre_code, page))
+
+        # Songs already enriched by a one-shot crawl count as fetched when their file was written
+        for emotion in self.emotions:
+            filepath = os.path.join(crawl_music.DATA_DIR, f"{emotion}.json")
+            mtime = os.path.getmtime(filepath) if os.path.exists(filepath) else None
+            for song_id, song in self.store.songs[emotion].items():
+                fetched = None if song.get('detail_status') == crawl_music.DETAIL_PENDING else mtime
+                self._add_unit('song_detail', (song_id,), fetched)
+
+        print(f"[OK] {len(self.units)} fetch units registered")
+
+    # ---------- scheduling ----------
+
+    def _schedule(self, key):
+        unit = self.units[key]
+        source = self.sources[unit['kind']]
+        heapq.heappush(self.queues.setdefault(source, []), (unit['due'], key))
+
+    def _pop_due(self, source, now):
+        """Pop the most overdue unit for a source (skipping stale heap entries)"""
+        queue = self.queues.get(source, [])
+        while queue:
+            due, key = queue[0]
+            if self.units[key]['due'] != due:
+                heapq.heappop(queue)
+                continue
+            if due > now:
+                return None
+            heapq.heappop(queue)
+            return key
+        return None
+
+    def run(self, max_fetches=None):
+        """
+        Main loop until stop() is called (or max_fetches is reached)
+
+        Args:
+            max_fetches (int): Stop after this many fetches (None = run forever)
+        """
+        last_checkpoint = last_stats = time.time()
+        try:
+            while not self.stop_event.is_set():
+                now = time.time()
+                fetched = False
+
+                for source, budget in self.budgets.items():
+                    if now < self.next_slot.get(source, 0.0):
+                        continue
+                    key = self._pop_due(source, now)
+                    if key is None:
+                        continue
+                    self.next_slot[source] = now + 60.0 / budget
+                    self.refresh(key)
+                    fetched = True
+
+                if max_fetches is not None and self.fetches >= max_fetches:
+                    break
+
+                now = time.time()
+                if now - last_checkpoint >= CHECKPOINT_INTERVAL:
+                    self.checkpoint()
+                    last_checkpoint = now
+                if now - last_stats >= STATS_INTERVAL:
+                    self.print_stats()
+                    last_stats = now
+
+                if not fetched:
+                    self.stop_event.wait(self._idle_time(now))
+        finally:
+            self.checkpoint()
+            self.session.close()
+            self.print_stats()
+
+    def _idle_time(self, now):
+        """Seconds until any source could fetch a due unit (capped at one second)"""
+        wake = now + 1.0
+        for source in self.budgets:
+            queue = self.queues.get(source)
+            if queue:
+                wake = min(wake, max(queue[0][0], self.next_slot.get(source, 0.0)))
+        return max(0.01, wake - now)
+
+    def stop(self, *_):
+        """Request graceful shutdown (safe to call from a signal handler)"""
+        self.stop_event.set()
+
+    # ---------- fetching ----------
+
+    def _on_response(self, response, *args, **kwargs):
+        """Session hook: remember the last status per host (crawlers swallow HTTP errors)"""
+        retry_after = response.headers.get('Retry-After', '')
+        self.last_response[urlparse(response.url).netloc] = (
+            response.status_code, float(retry_after) if retry_after.isdigit() else None)
+
+    def refresh(self, key):
+        """Fetch one unit, detect changes and reschedule it"""
+        unit = self.units[key]
+        kind, params = unit['kind'], unit['params']
+        source = self.sources[kind]
+        host = self.hosts[source]
+        now = time.time()
+        self.fetches += 1
+        self.last_response.pop(host, None)
+
+        content = self._fetch(kind, params)
+        if content is None:
+            unit['failures'] += 1
+            unit['retry_streak'] = unit.get('retry_streak', 0) + 1
+            status, retry_after = self.last_response.get(host, (None, None))
+            unit['due'] = now + retry_delay(unit, status == 429 or (status or 0) >= 500)
+            if status == 429:
+                # Throttled: pause every source served by this host
+                pause = retry_after or 60.0 / self.budgets[source]
+                for other, other_host in self.hosts.items():
+                    if other_host == host:
+                        self.next_slot[other] = max(self.next_slot.get(other, 0.0), now + pause)
+            self._schedule(key)
+            return
+
+        unit['retry_streak'] = 0
+
+        digest = content_hash(content)
+        if unit['hash'] is not None and digest != unit['hash']:
+            unit['changes'] += 1
+        unit['hash'] = digest
+        unit['fetches'] += 1
+        unit['first_fetched'] = unit['first_fetched'] or now
+        unit['last_fetched'] = now
+        unit['due'] = next_due(unit, now)
+        self._schedule(key)
+
+    def _fetch(self, kind, params):
+        """
+        Fetch a unit and merge it into the data store
+
+        Returns:
+            Parsed content used for change detection, or None on failure
+        """
+        if kind == 'kyobo':
+            emotion, keyword, sort_type, page = params
+            try:
+                books = crawl_books.fetch_keyword(keyword, sort_type, page, session=self.session)
+            except Exception as e:
+                print(f"[FAIL] Crawling failed: {e}")
+                return None
+            # An empty result page is valid content (tracked for changes, not retried)
+            if books:
+                self.store.upsert_books(emotion, books)
+            return books
+
+        if kind == 'melon_list':
+            genre_code, page = params
+            result = crawl_music.crawl_genre_page(self.session, genre_code, page)
+            if result is None:
+                return None
+            songs, _ = result
+            for song_id in self.store.upsert_songs(genre_code, songs):
+                self._add_unit('song_detail', (song_id,))
+            return songs
+
+        if kind == 'song_detail':
+            song_id, = params
+            detail = crawl_music.crawl_song_detail(self.session, self.store.song_url(song_id))
+            if not detail.get('genre') and not detail.get('dj_tags'):
+                return None
+            self.store.apply_detail(song_id, detail)
+            return detail
+
+        raise ValueError(f"Unknown unit kind: {kind}")
+
+    # ---------- stats ----------
+
+    def stats(self):
+        """
+        Freshness / lag statistics per unit kind
+
+        Returns:
+            dict: kind -> units, never fetched, overdue, lag and expected stale fraction
+        """
+        now = time.time()
+        result = {}
+        for unit in self.units.values():
+            entry = result.setdefault(unit['kind'], {
+                'units': 0, 'never_fetched': 0, 'overdue': 0, 'failures': 0, 'changes': 0,
+                'max_lag_seconds': 0.0, 'mean_age_seconds': 0.0, 'expected_stale_fraction': 0.0,
+            })
+            entry['units'] += 1
+            entry['failures'] += unit['failures']
+            entry['changes'] += unit['changes']
+            entry['expected_stale_fraction'] += staleness(unit, now)
+            if not unit['last_fetched']:
+                entry['never_fetched'] += 1
+            else:
+                entry['mean_age_seconds'] += now - unit['last_fetched']
+            if unit['due'] <= now:
+                entry['overdue'] += 1
+                if unit['last_fetched']:
+                    entry['max_lag_seconds'] = max(entry['max_lag_seconds'], now - unit['due'])
+
+        for entry in result.values():
+            fetched = entry['units'] - entry['never_fetched']
+            entry['mean_age_seconds'] = round(entry['mean_age_seconds'] / fetched, 1) if fetched else None
+            entry['expected_stale_fraction'] = round(entry['expected_stale_fraction'] / entry['units'], 4)
+            entry['max_lag_seconds'] = round(entry['max_lag_seconds'], 1)
+        return {'generated_at': now, 'fetches_this_run': self.fetches, 'kinds': result}
+
+    def print_stats(self):
+        stats = self.stats()
+        print("\n" + "=" * 60)
+        print(f"FRESHNESS ({stats['fetches_this_run']} fetches this run)")
+        print("=" * 60)
+        print(f"{'kind':<13}{'units':>7}{'never':>7}{'overdue':>9}{'stale%':>8}{'max lag(h)':>12}{'age(h)':>9}")
+        for kind, entry in stats['kinds'].items():
+            age = entry['mean_age_seconds']
+            print(f"{kind:<13}{entry['units']:>7}{entry['never_fetched']:>7}{entry['overdue']:>9}"
+                  f"{100 * entry['expected_stale_fraction']:>7.1f}%{entry['max_lag_seconds'] / 3600:>12.1f}"
+                  f"{(age / 3600 if age is not None else 0):>9.1f}")
+        print("=" * 60)
+
+
+# ==================== Main Execution ====================
+
+def main():
+    """Main execution function"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Keep data/books and data/musics fresh')
+    parser.add_argument('--emotions', nargs='+', default=list(crawl_books.EMOTION_KEYWORDS),
+                        choices=list(crawl_books.EMOTION_KEYWORDS))
+    parser.add_argument('--budget-kyobo', type=int, default=DEFAULT_BUDGETS['kyobo'],
+                        help='Requests per minute to Kyobo')
+    parser.add_argument('--budget-melon', type=int, default=DEFAULT_BUDGETS['melon'],
+                        help='Requests per minute to Melon')
+    parser.add_argument('--max-fetches', type=int, default=None, help='Exit after this many fetches')
+    parser.add_argument('--stats', action='store_true', help='Print freshness stats from saved state and exit')
+    args = parser.parse_args()
+
+    daemon = RefreshDaemon({'kyobo': args.budget_kyobo, 'melon': args.budget_melon}, args.emotions)
+
+    if args.stats:
+        daemon.print_stats()
+        daemon.session.close()
+        return
+
+    signal.signal(signal.SIGINT, daemon.stop)
+    signal.signal(signal.SIGTERM, daemon.stop)
+
+    print("=" * 60)
+    print("REFRESH DAEMON STARTED (Ctrl+C to stop, state is checkpointed)")
+    print("=" * 60)
+    daemon.run(args.max_fetches)
+    print("\n[DONE] Refresh daemon stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent cross-run seen-ID index
+mmap Bloom filter for fast negative checks + SQLite set for exact confirmation
+"""
+
+import hashlib
+import math
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+from collections import Counter
+
+try:
+    import fcntl
+except ImportError:  # Windows: bloom writes are only serialized within the process
+    fcntl = None
+
+
+# ==================== Configuration ====================
+
+SEEN_DIR = os.path.join('data', 'seen')
+
+# Bloom filter sizing per namespace (200K keys at 0.1% -> ~360KB file)
+BLOOM_CAPACITY = 200_000
+BLOOM_ERROR_RATE = 0.001
+
+# File header: magic, version, bit count, hash count, capacity
+BLOOM_MAGIC = b'CRLBLOOM'
+BLOOM_HEADER = struct.Struct('<8sIQIQ')
+
+
+# ==================== Bloom Filter ====================
+
+class BloomFilter:
+    """
+    Memory-mapped Bloom filter shared between processes through its file
+
+    Bits are only ever set, so concurrent readers never need a lock; writers
+    take an exclusive flock so read-modify-write of a byte is not lost.
+    """
+
+    def __init__(self, path, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        self.path = path
+        self.created = not os.path.exists(path)
+
+        if self.created:
+            num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+            num_bits = (num_bits + 7) // 8 * 8
+            num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(BLOOM_HEADER.pack(BLOOM_MAGIC, 1, num_bits, num_hashes, capacity))
+                f.truncate(BLOOM_HEADER.size + num_bits // 8)
+            # Another process may have created it meanwhile; keep whichever landed first
+            try:
+                os.link(tmp_path, path)
+            except (FileExistsError, OSError):
+                if not os.path.exists(path):
+                    os.replace(tmp_path, path)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self.file = open(path, 'r+b')
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+        magic, _, self.num_bits, self.num_hashes, self.capacity = BLOOM_HEADER.unpack_from(self.mm, 0)
+        if magic != BLOOM_MAGIC:
+            raise ValueError(f"Not a bloom filter file: {path}")
+        self.lock = threading.Lock()
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, key):
+        mm, offset = self.mm, BLOOM_HEADER.size
+        return all(mm[offset + (pos >> 3)] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def add_many(self, keys):
+        offset = BLOOM_HEADER.size
+        positions = [pos for key in keys for pos in self._positions(key)]
+        with self.lock:
+            if fcntl:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+            try:
+                for pos in positions:
+                    self.mm[offset + (pos >> 3)] |= 1 << (pos & 7)
+            finally:
+                if fcntl:
+                    fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+
+    def fill_ratio(self):
+        """Fraction of bits set (estimated false-positive rate is fill_ratio ** num_hashes)"""
+        bits = int.from_bytes(self.mm[BLOOM_HEADER.size:], 'little').bit_count()
+        return bits / self.num_bits
+
+    def close(self):
+        self.mm.close()
+        self.file.close()
+
+
+# ==================== Seen Index ====================
+
+class SeenIndex:
+    """
+    Seen-ID sets (ISBN, product_id, song_id, ...) that persist across runs
+
+    Namespaces are free-form strings such as 'isbn/joy' or 'song_id/joy'.
+    Membership checks hit the Bloom filter first; only Bloom positives are
+    confirmed against SQLite (WAL mode, safe for multiple processes).
+
+    Usage:
+        with SeenIndex() as index:
+            if not index.contains('isbn/joy', isbn):
+                ...
+            index.add_many('isbn/joy', isbns)
+    """
+
+    def __init__(self, path=SEEN_DIR, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.blooms = {}
+        self.counters = Counter()
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(os.path.join(path, 'seen.sqlite3'), timeout=30,
+                                    check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS seen (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID
+        """)
+
+    def _bloom(self, namespace):
+        bloom = self.blooms.get(namespace)
+        if bloom is None:
+            filename = re.sub(r'[^0-9A-Za-z_-]', '_', namespace) + '.bloom'
+            bloom = BloomFilter(os.path.join(self.path, filename), self.capacity, self.error_rate)
+            if bloom.created:
+                # New or deleted filter file: rebuild from the exact set so it has no false negatives
+                rows = self.conn.execute('SELECT key FROM seen WHERE namespace = ?', (namespace,))
+                bloom.add_many(key for (key,) in rows)
+            self.blooms[namespace] = bloom
+        return bloom
+
+    def contains(self, namespace, key):
+        """
+        Check whether a key was recorded in any previous run
+
+        Args:
+            namespace (str): ID namespace (e.g. 'isbn/joy')
+            key (str): ID to check
+
+        Returns:
+            bool: True if the key is in the exact set
+        """
+        with self.lock:
+            self.counters['lookups'] += 1
+            if key not in self._bloom(namespace):
+                self.counters['bloom_negatives'] += 1
+                return False
+
+            row = self.conn.execute('SELECT 1 FROM seen WHERE namespace = ? AND key = ?',
+                                    (namespace, key)).fetchone()
+            self.counters['confirmed' if row else 'false_positives'] += 1
+            return row is not None
+
+    def add_many(self, namespace, keys):
+        """
+        Record keys as seen (exact set first, then Bloom filter)
+
+        Args:
+            namespace (str): ID namespace
+            keys (iterable): IDs to record
+
+        Returns:
+            int: Number of keys that were not seen before
+        """
+        keys = [key for key in keys if key]
+        now = time.time()
+        with self.lock:
+            before = self.conn.total_changes
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self.conn.executemany('INSERT OR IGNORE INTO seen (namespace, key, first_seen) VALUES (?, ?, ?)',
+                                      [(namespace, key, now) for key in keys])
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+            added = self.conn.total_changes - before
+            self._bloom(namespace).add_many(keys)
+            self.counters['adds'] += added
+        return added
+
+    def add(self, namespace, key):
+        """Record a single key, returns True if it was new"""
+        return self.add_many(namespace, [key]) == 1
+
+    def sync(self, namespace, keys):
+        """
+        Make a namespace match the keys actually stored in the data file it guards
+
+        Keys whose items are gone from the file (overwritten by a plain run,
+        deleted or restored file, ...) are forgotten so they get crawled again;
+        keys present in the file but missing from the index are recorded.
+        Bloom filters never drop bits, so after removals this process rebuilds
+        its filter; other processes only see extra Bloom positives, which the
+        SQLite check still rejects.
+
+        Args:
+            namespace (str): ID namespace
+            keys (iterable): IDs currently in the data file
+
+        Returns:
+            tuple: (added, removed) key counts
+        """
+        keys = {key for key in keys if key}
+        with self.lock:
+            stored = {key for (key,) in self.conn.execute(
+                'SELECT key FROM seen WHERE namespace = ?', (namespace,))}
+            stale = stored - keys
+            if stale:
+                self.conn.execute('BEGIN IMMEDIATE')
+                try:
+                    self.conn.executemany('DELETE FROM seen WHERE namespace = ? AND key = ?',
+                                          [(namespace, key) for key in stale])
+                    self.conn.execute('COMMIT')
+                except Exception:
+                    self.conn.execute('ROLLBACK')
+                    raise
+                self.counters['removed'] += len(stale)
+
+                bloom = self._bloom(namespace)
+                bloom.close()
+                os.remove(bloom.path)
+                del self.blooms[namespace]
+
+        added = self.add_many(namespace, keys - stored)
+        return added, len(stale)
+
+    def stats(self):
+        """
+        Membership statistics
+
+        Returns:
+            dict: Lookup counters for this process and per-namespace sizes / Bloom fill
+        """
+        with self.lock:
+            counts = dict(self.conn.execute('SELECT namespace, COUNT(*) FROM seen GROUP BY namespace'))
+            namespaces = {}
+            for namespace, count in counts.items():
+                bloom = self._bloom(namespace)
+                fill = bloom.fill_ratio()
+                namespaces[namespace] = {
+                    'keys': count,
+                    'bloom_capacity': bloom.capacity,
+                    'bloom_fill_ratio': round(fill, 4),
+                    'estimated_fp_rate': round(fill ** bloom.num_hashes, 6),
+                }
+            return {'lookups': dict(self.counters), 'namespaces': namespaces}
+
+    def print_stats(self):
+        stats = self.stats()
+        lookups = stats['lookups']
+        print(f"[INFO] Seen index: {lookups.get('lookups', 0)} lookups, "
+              f"{lookups.get('bloom_negatives', 0)} bloom negatives, "
+              f"{lookups.get('confirmed', 0)} known, "
+              f"{lookups.get('false_positives', 0)} false positives, "
+              f"{lookups.get('adds', 0)} new keys")
+        for namespace, info in stats['namespaces'].items():
+            print(f"       {namespace}: {info['keys']} keys, "
+                  f"bloom fill {info['bloom_fill_ratio']:.2%}, est. FP {info['estimated_fp_rate']:.4%}")
+
+    def close(self):
+        for bloom in self.blooms.values():
+            bloom.close()
+        self.blooms.clear()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()